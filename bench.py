@@ -0,0 +1,156 @@
+"""
+End-to-end digest benchmark against the local stand-in server (replay.py).
+
+Runs build_todays_games cold (empty cache), warm (straight after) and stale
+(cache aged past every TTL but inside the grace windows), then posts the
+digest to the stand-in webhook. Each scenario runs in a fresh process
+(the cache carries over on disk), so its peak RSS is its own. For each
+scenario it reports wall time, API and webhook request counts, bytes
+received and peak RSS. --trace-memory adds tracemalloc's peak of Python
+allocations, at the cost of much slower (so not comparable) timings.
+
+    python bench.py                         # real LEAGUES, 10 games each
+    python bench.py --leagues 40 --events 300 --latency 0.05
+    python bench.py --fixtures recordings/  # replay a recorded run (on its own date)
+    python bench.py --date 2025-01-15       # pin "today"
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+
+import sports
+from notify_discord import DiscordDelivery, Outbox, send_discord_webhook
+from replay import StandInServer, fixtures_date, load_fixtures, synthetic_fixtures, synthetic_leagues
+
+SCENARIOS = ("cold", "warm", "stale")
+
+def _age_cache(db_path: str, seconds: int) -> None:
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE entries SET ts = ts - ?", (seconds,))
+
+def _stale_age() -> int:
+    """Older than every endpoint TTL, younger than every TTL + grace."""
+    policies = sports.ENDPOINT_POLICIES.values()
+    return min(max(p["ttl"] for p in policies) + 1, min(p["ttl"] + p["grace"] for p in policies) - 1)
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux (bytes on macOS); it is a process-wide high-water mark,
+    # hence one process per scenario.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if os.uname().sysname == "Darwin" else rss / 1e3
+
+def _run_digest(name: str, env: tuple, tz_name: str, webhook_url: str, rate: float,
+                trace_memory: bool, day: date) -> dict:
+    """One scenario's digest run, in its own process: fetch, render and post."""
+    leagues, sports.CACHE_FILE, sports.CACHE_DB_FILE, sports.HISTORY_DB_FILE, base_url, outbox = env
+    if leagues is not None:
+        sports.LEAGUES = leagues
+    os.environ["SPORTSDB_BASE_URL"] = base_url
+    if trace_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    digest = sports.build_todays_games(tz_name, "bench", rate_per_second=rate, burst=int(rate), today_local=day)
+    if digest == "No games or events today.":
+        print(f"warning: {name} run found no games for {day or 'today'}; "
+              "do the fixtures cover that date (see --date)?", file=sys.stderr)
+    fetch_s = time.perf_counter() - t0
+    with DiscordDelivery(Outbox(outbox)) as delivery:
+        send_discord_webhook(webhook_url, digest, title="Benchmark", delivery=delivery)
+    wall_s = time.perf_counter() - t0
+    py_peak = None
+    if trace_memory:
+        py_peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return {
+        "wall_s": wall_s,
+        "fetch_s": fetch_s,
+        "max_rss_mb": _max_rss_mb(),
+        "py_peak_mb": py_peak,
+        "digest_lines": digest.count("\n") + 1,
+    }
+
+def run_scenario(name: str, server: StandInServer, env: tuple, tz_name: str, rate: float,
+                 trace_memory: bool = False, day: date = None) -> dict:
+    """
+    Run one scenario in a fresh (spawned) process. env is (leagues or None,
+    cache file, cache db, history db, API base URL, outbox path).
+    """
+    server.reset_stats()
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        run = pool.submit(_run_digest, name, env, tz_name, server.webhook_url, rate, trace_memory, day).result()
+    return {
+        "scenario": name,
+        "wall_s": run["wall_s"],
+        "fetch_s": run["fetch_s"],
+        "api_requests": server.stats["api_requests"],
+        "webhook_requests": server.stats["webhook_requests"],
+        "status_304": server.stats["status_304"],
+        "bytes": server.stats["bytes"],
+        "max_rss_mb": run["max_rss_mb"],
+        "py_peak_mb": run["py_peak_mb"],
+        "digest_lines": run["digest_lines"],
+    }
+
+def run_benchmark(fixtures: dict, leagues: dict = None, tz_name: str = "UTC", latency: float = 0.0,
+                  rate_429: float = 0.0, error_rate: float = 0.0, rate: float = 1000.0,
+                  trace_memory: bool = False, day: date = None) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            StandInServer(fixtures, latency, rate_429, error_rate) as server:
+        cache_db = os.path.join(tmp, "cache.db")
+        env = (leagues, os.path.join(tmp, "cache.json"), cache_db, os.path.join(tmp, "history.db"),
+               server.base_url, os.path.join(tmp, "outbox.jsonl"))
+        for name in SCENARIOS:
+            if name == "stale":
+                _age_cache(cache_db, _stale_age())
+            results.append(run_scenario(name, server, env, tz_name, rate, trace_memory, day))
+    return results
+
+def _print_table(results: list) -> None:
+    cols = ("scenario", "wall_s", "fetch_s", "api_requests", "webhook_requests", "status_304",
+            "bytes", "max_rss_mb", "py_peak_mb", "digest_lines")
+    print("  ".join(f"{c:>16}" for c in cols))
+    for row in results:
+        cells = []
+        for c in cols:
+            v = row[c]
+            cells.append(f"{v:>16.3f}" if isinstance(v, float) else f"{'-' if v is None else v:>16}")
+        print("  ".join(cells))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark a digest run against the stand-in server.")
+    parser.add_argument("--fixtures", help="directory with a recorded fixtures.jsonl (default: synthetic)")
+    parser.add_argument("--leagues", type=int, default=0, help="synthetic leagues (default: the real LEAGUES)")
+    parser.add_argument("--events", type=int, default=10, help="synthetic events per league")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=1000.0, help="client requests per second")
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peaks (slow)")
+    parser.add_argument("--date", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help='the digest\'s "today" (default: the recording\'s date, or today)')
+    args = parser.parse_args(argv)
+
+    leagues = synthetic_leagues(args.leagues) if args.leagues else None
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+        day = args.date or fixtures_date(fixtures)
+    else:
+        day = args.date or datetime.now(timezone.utc).date()
+        fixtures = synthetic_fixtures(leagues or sports.LEAGUES, args.events, day)
+
+    results = run_benchmark(fixtures, leagues, latency=args.latency, rate_429=args.rate_429,
+                            error_rate=args.error_rate, rate=args.rate, trace_memory=args.trace_memory,
+                            day=day)
+    _print_table(results)
+
+if __name__ == "__main__":
+    main()
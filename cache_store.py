@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+# --- Eviction defaults ---
+# Expired entries are kept for a while (stale data is still useful as a
+# fallback) and only dropped once they are older than this.
+STALE_RETENTION_SECONDS = 3 * 24 * 60 * 60  # 3 days
+MAX_CACHE_BYTES = 5 * 1024 * 1024  # 5 MB of payload
+DEFAULT_TTL_SECONDS = 60 * 60
+
+
+class CacheStore(ABC):
+    """
+    Key/value cache for API payloads.
+    Entries are dicts shaped like the legacy JSON cache: {"data", "ts", "meta"}.
+    """
+
+    @abstractmethod
+    def get(self, key: str):
+        ...
+
+    @abstractmethod
+    def set(self, key: str, data, ttl_seconds: int = DEFAULT_TTL_SECONDS, meta: dict = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def evict(self, now: int = None) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonCacheStore(CacheStore):
+    """
+    Whole-file JSON cache (the original format).
+    Held in memory and written once, atomically, on close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._events = _read_json_events(path)
+
+    def get(self, key: str):
+        return self._events.get(key)
+
+    def set(self, key: str, data, ttl_seconds: int = DEFAULT_TTL_SECONDS, meta: dict = None) -> None:
+        now = int(time.time())
+        with self._lock:
+            self._events[key] = {"data": data, "ts": now, "expires": now + ttl_seconds, "meta": meta or {}}
+            self._dirty = True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if self._events.pop(key, None) is not None:
+                self._dirty = True
+
+    def evict(self, now: int = None) -> int:
+        now = int(now or time.time())
+        with self._lock:
+            dead = [k for k, v in self._events.items()
+                    if v.get("expires", v.get("ts", 0) + DEFAULT_TTL_SECONDS) + STALE_RETENTION_SECONDS < now]
+            for k in dead:
+                del self._events[k]
+            self._dirty = self._dirty or bool(dead)
+        return len(dead)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump({"events": self._events}, f)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except Exception:
+                pass
+
+
+class SqliteCacheStore(CacheStore):
+    """
+    SQLite cache in WAL mode. Every set() is its own small transaction, so
+    overlapping cron runs never see a half-written cache.
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_CACHE_BYTES,
+                 stale_retention_seconds: int = STALE_RETENTION_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stale_retention_seconds = stale_retention_seconds
+        self._lock = threading.Lock()
+        # Shared by the fetch worker threads; access is serialized by _lock.
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key     TEXT PRIMARY KEY,
+                data    TEXT NOT NULL,
+                ts      INTEGER NOT NULL,
+                expires INTEGER NOT NULL,
+                size    INTEGER NOT NULL,
+                meta    TEXT
+            );
+            CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+            CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+            CREATE TABLE IF NOT EXISTS store_meta (
+                name  TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, ts, expires, meta FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, ts, expires, meta = row
+        return {"data": json.loads(data), "ts": ts, "expires": expires,
+                "meta": json.loads(meta) if meta else {}}
+
+    def set(self, key: str, data, ttl_seconds: int = DEFAULT_TTL_SECONDS, meta: dict = None) -> None:
+        now = int(time.time())
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, data, ts, expires, size, meta) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, payload, now, now + ttl_seconds, len(payload), json.dumps(meta) if meta else None),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def evict(self, now: int = None) -> int:
+        """Drop entries expired past the retention window, then the oldest ones over max_bytes."""
+        now = int(now or time.time())
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM entries WHERE expires < ?", (now - self.stale_retention_seconds,)
+            ).rowcount
+            removed += self._conn.execute("""
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY ts DESC, key) AS running FROM entries
+                    ) WHERE running > ?
+                )
+            """, (self.max_bytes,)).rowcount
+        return removed
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        One-time import of the legacy .sportsdb_cache.json.
+        The JSON file is renamed afterwards so it is never imported twice.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        events = _read_json_events(json_path)
+        rows = []
+        for key, item in events.items():
+            if not isinstance(item, dict) or "data" not in item:
+                continue
+            ts = int(item.get("ts", 0))
+            payload = json.dumps(item["data"], separators=(",", ":"))
+            rows.append((key, payload, ts, ts + DEFAULT_TTL_SECONDS, len(payload)))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = self._conn.execute(
+                    "SELECT 1 FROM store_meta WHERE name = 'migrated_json'"
+                ).fetchone()
+                if not done:
+                    # Never overwrite something a newer run already stored.
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO entries (key, data, ts, expires, size) VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    self._conn.execute(
+                        "INSERT INTO store_meta (name, value) VALUES ('migrated_json', ?)",
+                        (str(int(time.time())),),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        try:
+            os.replace(json_path, json_path + ".migrated")
+        except OSError:
+            pass
+        return 0 if done else len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _read_json_events(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return data.get("events", {}) or {}
+    except Exception:
+        return {}
+
+
+def open_cache(path: str, backend: str = "sqlite", legacy_json_path: str = None) -> CacheStore:
+    """Open the cache backend, migrating the legacy JSON file and evicting old entries."""
+    if backend == "json":
+        store = JsonCacheStore(path)
+    elif backend == "sqlite":
+        store = SqliteCacheStore(path)
+        if legacy_json_path:
+            try:
+                store.migrate_from_json(legacy_json_path)
+            except Exception:
+                pass
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    try:
+        store.evict()
+    except Exception:
+        pass
+    return store
@@ -0,0 +1,179 @@
+from datetime import date, datetime, timezone
+
+# Bump when the cached record layout changes; payloads without a matching
+# "format" are treated as raw API events and re-parsed.
+EVENT_RECORD_FORMAT = 2
+
+# strStatus values of games played to a result.
+COMPLETED_STATUSES = {"FT", "AET", "PEN", "AOT", "AP", "Match Finished", "Final", "Finished", "AWD", "WO"}
+# Games called off: over as far as live updates go, but without a result.
+CALLED_OFF_STATUSES = {"CANC", "PST", "ABD", "Cancelled", "Postponed"}
+FINISHED_STATUSES = COMPLETED_STATUSES | CALLED_OFF_STATUSES
+
+
+def _safe_int(x):
+    try:
+        return int(x)
+    except Exception:
+        return None
+
+def _parse_event_date(date_str: str):
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+def _parse_start_utc(date_str: str, time_str: str):
+    """Combine dateEvent/strTime into a UTC datetime. Midnight/blank means 'time unknown'."""
+    if not date_str or not time_str:
+        return None
+    t = time_str.strip()
+    if t in ("", "00:00:00", "00:00"):
+        return None
+    try:
+        if len(t) == 5:
+            t += ":00"
+        return datetime.strptime(f"{date_str} {t[:8]}", "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except Exception:
+        return None
+
+
+class Event:
+    """
+    The handful of TheSportsDB event fields the digest actually uses.
+    Parsed once at ingest; cached as a flat list (see to_record()).
+    """
+
+    __slots__ = ("id", "league_id", "name", "home", "away", "home_id", "away_id",
+                 "home_score", "away_score", "date", "start", "season", "status")
+
+    def __init__(self, id, league_id=None, name="", home="?", away="?", home_id=None, away_id=None,
+                 home_score=None, away_score=None, date=None, start=None, season=None, status=None):
+        self.id = id
+        self.league_id = league_id
+        self.name = name
+        self.home = home
+        self.away = away
+        self.home_id = home_id
+        self.away_id = away_id
+        self.home_score = home_score
+        self.away_score = away_score
+        self.date = date
+        self.start = start
+        self.season = season
+        self.status = status
+
+    @classmethod
+    def from_api(cls, raw: dict) -> "Event":
+        date_str = raw.get("dateEvent") or ""
+        return cls(
+            id=raw.get("idEvent"),
+            league_id=_safe_int(raw.get("idLeague")),
+            name=raw.get("strEvent") or "",
+            home=raw.get("strHomeTeam") or "?",
+            away=raw.get("strAwayTeam") or "",
+            home_id=raw.get("idHomeTeam"),
+            away_id=raw.get("idAwayTeam"),
+            home_score=_safe_int(raw.get("intHomeScore")),
+            away_score=_safe_int(raw.get("intAwayScore")),
+            date=_parse_event_date(date_str),
+            start=_parse_start_utc(date_str, raw.get("strTime") or ""),
+            season=raw.get("strSeason"),
+            status=raw.get("strStatus"),
+        )
+
+    def to_record(self) -> list:
+        return [self.id, self.league_id, self.name, self.home, self.away, self.home_id, self.away_id,
+                self.home_score, self.away_score,
+                self.date.isoformat() if self.date else None,
+                int(self.start.timestamp()) if self.start else None,
+                self.season, self.status]
+
+    @classmethod
+    def from_record(cls, rec: list) -> "Event":
+        (eid, league_id, name, home, away, home_id, away_id,
+         home_score, away_score, date_str, start_ts, season, status) = rec
+        return cls(
+            eid, league_id, name, home, away, home_id, away_id, home_score, away_score,
+            date.fromisoformat(date_str) if date_str else None,
+            datetime.fromtimestamp(start_ts, tz=timezone.utc) if start_ts is not None else None,
+            season, status,
+        )
+
+    @property
+    def has_final_score(self) -> bool:
+        return self.home_score is not None and self.away_score is not None
+
+    @property
+    def is_finished(self) -> bool:
+        """Over: played to a result or called off."""
+        return (self.status or "").strip() in FINISHED_STATUSES
+
+    @property
+    def is_completed(self) -> bool:
+        """Played to a result (a live score is not one)."""
+        return (self.status or "").strip() in COMPLETED_STATUSES
+
+    @property
+    def is_team_game(self) -> bool:
+        # Non-team sports (F1, UFC, etc.) come back with one or no team set
+        return bool(self.away) and self.home != self.away and self.home != "?"
+
+    def __repr__(self):
+        return f"Event({self.id!r}, {self.name!r})"
+
+
+def trim_payload(data) -> dict:
+    """Reduce a raw API response to {"format", "events": [records]} for caching."""
+    raw_events = (data or {}).get("events") or []
+    return {
+        "format": EVENT_RECORD_FORMAT,
+        "events": [Event.from_api(e).to_record() for e in raw_events if isinstance(e, dict)],
+    }
+
+def events_from_payload(data) -> list:
+    """Events from a cached payload, accepting both trimmed records and raw API dicts."""
+    data = data or {}
+    rows = data.get("events") or []
+    if data.get("format") == EVENT_RECORD_FORMAT:
+        return [Event.from_record(r) for r in rows]
+    return [Event.from_api(e) for e in rows if isinstance(e, dict)]
+
+
+class ScheduleIndex:
+    """
+    In-memory date -> {event id: Event} index over a league's schedule.
+    Built from a bulk season payload and patched day by day, so any date in
+    a range is answered with one dict lookup.
+    """
+
+    __slots__ = ("_by_date", "_day_of", "first", "last")
+
+    def __init__(self, events=()):
+        self._by_date = {}
+        self._day_of = {}
+        self.first = None
+        self.last = None
+        self.add(events)
+
+    def add(self, events) -> None:
+        """Insert events, replacing any already indexed under the same id (even on another day)."""
+        for e in events:
+            if e.date is None:
+                continue
+            prev_day = self._day_of.get(e.id)
+            if prev_day is not None and prev_day != e.date:
+                self._by_date[prev_day].pop(e.id, None)  # rescheduled
+            self._day_of[e.id] = e.date
+            self._by_date.setdefault(e.date, {})[e.id] = e
+            if self.first is None or e.date < self.first:
+                self.first = e.date
+            if self.last is None or e.date > self.last:
+                self.last = e.date
+
+    def covers(self, day) -> bool:
+        """True if day falls inside the dates the indexed schedule spans."""
+        return self.first is not None and self.first <= day <= self.last
+
+    def events_on(self, day) -> list:
+        return list(self._by_date.get(day, {}).values())
@@ -0,0 +1,124 @@
+import time
+from datetime import timedelta
+
+from events import events_from_payload
+
+# --- Activity index settings ---
+ACTIVITY_REFRESH_SECONDS = 7 * 24 * 60 * 60  # re-check dormant leagues weekly
+ACTIVITY_TTL_SECONDS = 60 * 24 * 60 * 60  # keep index entries well past eviction
+ACTIVE_LEAD_DAYS = 1  # wake a league up this many days before its next event
+# When the API knows no next event, stay active this long after the last one
+# (covers weekly leagues and gaps in eventsnextleague on the free tier).
+RECENT_EVENT_DAYS = 8
+
+
+def _activity_key(league_id) -> str:
+    return f"activity:{league_id}"
+
+
+class LeagueActivity:
+    """
+    Persisted per-league activity index (stored in the API cache).
+
+    Each entry records the next known event date, the last played date and
+    the season window seen in eventsnextleague/eventspastleague. A league
+    whose next event is further away than ACTIVE_LEAD_DAYS, or which has
+    nothing scheduled and nothing recent, is dormant and can be skipped
+    without any requests. Entries are refreshed weekly, or once the next
+    known event date has passed.
+
+    Leagues nobody follows never fetch the past/next endpoints for the
+    digest, so their entries start as partial ones built from the
+    eventsday.php results the run already has (see observe()) and are only
+    refreshed on the weekly schedule. A partial entry never marks a league
+    dormant.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def lookup(self, league_id):
+        item = self.cache.get(_activity_key(league_id))
+        return item.get("data") if item else None
+
+    def needs_refresh(self, entry, days, followed: bool = True) -> bool:
+        """
+        Whether refresh() should rebuild entry. Followed leagues fetch the
+        past/next endpoints anyway, so they refresh as soon as anything is
+        out of date; other leagues only once their entry is a week old.
+        """
+        if not entry:
+            return followed
+        if time.time() - entry.get("checked", 0) >= ACTIVITY_REFRESH_SECONDS:
+            return True
+        if not followed:
+            return False
+        next_event = entry.get("next_event")
+        # The known next event has been played: find out what comes after it.
+        return bool(next_event) and next_event < min(days).isoformat()
+
+    def refresh(self, fetcher, league_id, league_api_name, today):
+        """
+        Rebuild a league's entry from its past/next endpoints (usually served
+        from cache). Returns None, and keeps the old entry, if either fetch
+        failed, so an outage can't mark a league dormant for a week.
+        """
+        past_key, next_key = f"pastleague:{league_id}", f"nextleague:{league_id}"
+        past = events_from_payload(fetcher.get("eventspastleague.php", past_key,
+                                               {"id": league_id}, league=league_api_name))
+        upcoming = events_from_payload(fetcher.get("eventsnextleague.php", next_key,
+                                                   {"id": league_id}, league=league_api_name))
+        if fetcher.failed_recently(past_key) or fetcher.failed_recently(next_key):
+            return None
+        dated = [e for e in past + upcoming if e.date]
+        next_dates = [e.date for e in upcoming if e.date and e.date >= today]
+        past_dates = [e.date for e in past if e.date and e.date <= today]
+        seasons = [e.season for e in sorted(dated, key=lambda e: e.date) if e.season]
+        entry = {
+            "next_event": min(next_dates).isoformat() if next_dates else None,
+            "last_event": max(past_dates).isoformat() if past_dates else None,
+            "season": seasons[-1] if seasons else None,
+            "season_window": [min(e.date for e in dated).isoformat(),
+                              max(e.date for e in dated).isoformat()] if dated else None,
+            "checked": int(time.time()),
+        }
+        self._store(league_id, entry)
+        return entry
+
+    def observe(self, league_id, entry, events, today):
+        """
+        Fold events a run fetched anyway into entry, without any requests:
+        starts a partial entry (whose weekly clock starts now) if there is
+        none, and moves last_event up to the latest day with events.
+        Returns the entry as stored.
+        """
+        played = [e.date for e in events if e.date and e.date <= today]
+        last_event = max(played).isoformat() if played else None
+        if entry and (not last_event or last_event <= (entry.get("last_event") or "")):
+            return entry
+        entry = dict(entry or {"partial": True, "next_event": None, "last_event": None,
+                               "season": None, "season_window": None, "checked": int(time.time())})
+        if last_event:
+            entry["last_event"] = last_event
+        self._store(league_id, entry)
+        return entry
+
+    def _store(self, league_id, entry) -> None:
+        try:
+            self.cache.set(_activity_key(league_id), entry, ACTIVITY_TTL_SECONDS)
+        except Exception:
+            pass
+
+    def is_dormant(self, entry, days) -> bool:
+        if not entry or entry.get("partial"):
+            return False
+        first, last = min(days), max(days)
+        last_event = entry.get("last_event")
+        if last_event and last_event >= first.isoformat():
+            return False  # played during the (past) range
+        next_event = entry.get("next_event")
+        if next_event:
+            return next_event > (last + timedelta(days=ACTIVE_LEAD_DAYS)).isoformat()
+        if last_event:
+            return last_event < (first - timedelta(days=RECENT_EVENT_DAYS)).isoformat()
+        return True
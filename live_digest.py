@@ -0,0 +1,161 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from metrics import METRICS
+from notify_discord import DeliveryFailed, DiscordDelivery, edit_discord_webhook, send_discord_webhook
+from sports import LEAGUES, fetch_snapshot, render_digest
+from subscribers import digest_history, digest_title, fetch_options, followed_leagues, local_today
+
+_SCRIPT_DIR = Path(__file__).resolve().parent
+
+# --- Live mode settings ---
+LIVE_POLL_SECONDS = 120  # while at least one game is in progress
+MAX_GAME_DURATION = timedelta(hours=4)  # after this a game is assumed over
+# Live polls only hit eventsday.php and accept a copy up to a minute old.
+LIVE_POLICIES = {"eventsday.php": {"ttl": 60, "grace": 0}}
+LIVE_STATE_FILE = str(_SCRIPT_DIR / ".live_digest_state.json")
+
+def _in_progress(event, now: datetime) -> bool:
+    return (event.start is not None and not event.is_finished
+            and event.start <= now < event.start + MAX_GAME_DURATION)
+
+def _event_states(snapshot: dict) -> dict:
+    """{event id: (home score, away score, status)} — what a live edit can change."""
+    return {
+        e.id: (e.home_score, e.away_score, e.status)
+        for events in snapshot.values() for e in events
+    }
+
+def _plan_next_poll(snapshot: dict, now: datetime):
+    """
+    Returns (seconds until the next poll, leagues to poll then).
+    Polls every LIVE_POLL_SECONDS while games are on, sleeps until the next
+    known start time otherwise, and returns (None, []) once nothing is left.
+    """
+    window_end = now + timedelta(seconds=LIVE_POLL_SECONDS)
+    live = [league for league, events in snapshot.items()
+            if any(_in_progress(e, now) for e in events)]
+    if live:
+        soon = {league for league, events in snapshot.items()
+                if any(e.start and now < e.start <= window_end for e in events)}
+        return LIVE_POLL_SECONDS, [league for league in LEAGUES if league in soon or league in live]
+
+    upcoming = [e.start for events in snapshot.values() for e in events
+                if e.start and e.start > now and not e.is_finished]
+    if not upcoming:
+        return None, []
+    first = min(upcoming)
+    leagues = [league for league, events in snapshot.items()
+               if any(e.start and first <= e.start <= first + timedelta(seconds=LIVE_POLL_SECONDS)
+                      for e in events)]
+    return max((first - now).total_seconds(), 0) + LIVE_POLL_SECONDS, leagues
+
+def _merge(snapshot: dict, fresh: dict) -> dict:
+    """Overlay freshly polled events onto the snapshot, keeping events only the fallbacks found."""
+    merged = dict(snapshot)
+    for league, events in fresh.items():
+        by_id = {e.id: e for e in snapshot.get(league, [])}
+        by_id.update((e.id, e) for e in events)
+        merged[league] = list(by_id.values())
+    return merged
+
+def _load_state() -> dict:
+    try:
+        with open(LIVE_STATE_FILE, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_state(state: dict) -> None:
+    tmp = f"{LIVE_STATE_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, LIVE_STATE_FILE)
+    except Exception:
+        pass
+
+def run_live(subscribers: list, api_key: str, settings: dict, sleep=time.sleep) -> None:
+    """
+    Post each subscriber's digest, then keep it current until today's games
+    are over. Polls are scheduled from event start times, only for leagues
+    with games on, and a message is only edited when its rendered text changes.
+    Each subscriber's "today" is fixed at startup (and kept in the state
+    file), so edits after local midnight still render the day that was posted.
+    """
+    todays = {sub["name"]: local_today(sub) for sub in subscribers}
+    days = set(todays.values())
+    fetch_kwargs = fetch_options(settings)
+    snapshot = fetch_snapshot(days, api_key, fallback_leagues=followed_leagues(subscribers), **fetch_kwargs)
+
+    state = _load_state()
+    rendered = {}
+    history = digest_history(settings)
+    with DiscordDelivery() as delivery, (history or nullcontext()):
+        delivery.flush_outbox()
+
+        for sub in subscribers:
+            today_local = todays[sub["name"]]
+            today = today_local.isoformat()
+            text = render_digest(snapshot, sub["timezone"], sub["team_index"], sub["top_games_count"],
+                                 today_local=today_local, history=history)
+            title = digest_title(sub["timezone"], today_local=today_local)
+            prev = state.get(sub["name"], {})
+            try:
+                if prev.get("date") == today and prev.get("webhook_url") == sub["webhook_url"]:
+                    # Restarted mid-day: keep editing the messages posted earlier.
+                    ids = edit_discord_webhook(sub["webhook_url"], prev.get("message_ids", []), text,
+                                               title=title, delivery=delivery)
+                else:
+                    result = send_discord_webhook(sub["webhook_url"], text, title=title, delivery=delivery)
+                    ids = result["message_ids"]
+            except DeliveryFailed as e:
+                print(f"❌ Live digest for {sub['name']} failed: {e}")
+                ids = prev.get("message_ids", []) if prev.get("date") == today else []
+            state[sub["name"]] = {"date": today, "webhook_url": sub["webhook_url"], "message_ids": ids}
+            rendered[sub["name"]] = text
+        _save_state(state)
+        print(f"📡 Live mode: posted digest for {len(subscribers)} subscriber(s)")
+
+        states = _event_states(snapshot)
+        retry = set()  # subscribers whose last edit failed
+        while True:
+            delay, leagues = _plan_next_poll(snapshot, datetime.now(timezone.utc))
+            if delay is None:
+                print("🏁 Live mode: no games left today, exiting")
+                return
+            # The daemon runs all day: write out the trace and Prometheus file between polls.
+            METRICS.flush()
+            sleep(delay)
+
+            fresh = fetch_snapshot(days, api_key, fallback_leagues=set(), leagues=leagues,
+                                   policies=LIVE_POLICIES, **fetch_kwargs)
+            snapshot = _merge(snapshot, fresh)
+            new_states = _event_states(snapshot)
+            if new_states == states and not retry:
+                continue
+            changed = sum(1 for eid, s in new_states.items() if states.get(eid) != s)
+            states = new_states
+
+            for sub in subscribers:
+                entry = state[sub["name"]]
+                today_local = date.fromisoformat(entry["date"])
+                text = render_digest(snapshot, sub["timezone"], sub["team_index"], sub["top_games_count"],
+                                     today_local=today_local, history=history)
+                if text == rendered.get(sub["name"]) or not entry["message_ids"]:
+                    continue
+                try:
+                    entry["message_ids"] = edit_discord_webhook(
+                        sub["webhook_url"], entry["message_ids"], text,
+                        title=digest_title(sub["timezone"], today_local=today_local), delivery=delivery)
+                    rendered[sub["name"]] = text
+                    retry.discard(sub["name"])
+                except DeliveryFailed as e:
+                    retry.add(sub["name"])
+                    print(f"⚠️ Live update for {sub['name']} failed: {e}")
+            _save_state(state)
+            print(f"📡 Live mode: {changed} event(s) changed")
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Upper bounds (seconds) for every duration histogram.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_HELP = {
+    "digest_stage_duration_seconds": "Duration of digest run stages",
+    "digest_http_request_duration_seconds": "TheSportsDB request latency",
+    "digest_http_requests_total": "TheSportsDB responses by endpoint and status",
+    "digest_http_retries_total": "TheSportsDB requests retried after a 429",
+    "digest_http_429_sleep_seconds_total": "Seconds the shared limiter paused after 429s",
+    "digest_cache_lookups_total": "Fetch-layer cache outcomes (fresh, stale, negative, miss)",
+    "digest_fetch_errors_total": "Failed TheSportsDB fetches",
+    "digest_league_errors_total": "League fetches that raised",
+    "digest_league_events": "Events found for a league in the last run",
+    "digest_leagues_skipped_total": "League fetches skipped as dormant (out of season)",
+    "digest_history_results_stored_total": "Final results written to the results history",
+    "digest_history_errors_total": "Failed writes to the results history",
+    "digest_discord_requests_total": "Discord webhook responses by method and status",
+    "digest_discord_request_duration_seconds": "Discord webhook request latency",
+    "digest_last_run_timestamp_seconds": "Unix time the last run finished",
+}
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Span:
+    __slots__ = ("_metrics", "_stage", "_labels", "_trace", "_t0", "fields")
+
+    def __init__(self, metrics, stage, labels, trace):
+        self._metrics = metrics
+        self._stage = stage
+        self._labels = labels
+        self._trace = trace
+        self.fields = {}
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Instrumentation must never turn into the error: a bad label or
+        # field is dropped rather than raised from the traced block.
+        try:
+            elapsed = time.perf_counter() - self._t0
+            self._metrics.observe("digest_stage_duration_seconds", elapsed, stage=self._stage, **self._labels)
+            if self._trace:
+                # Explicit fields (e.g. a caught league error) override the defaults.
+                fields = {"duration_s": round(elapsed, 6), "error": repr(exc) if exc is not None else None,
+                          **self._labels, **self.fields}
+                self._metrics.event(self._stage, **fields)
+        except Exception:
+            pass
+        return False
+
+
+class Metrics:
+    """
+    Per-run instrumentation. Disabled by default: every call returns
+    immediately (span() hands back a shared no-op context), so the hooks
+    cost next to nothing unless configure() is given an output path.
+
+    Outputs a JSON-lines trace (one object per span/event) and, on flush(),
+    a Prometheus textfile-collector file with counters, gauges and
+    duration histograms.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._trace_path = None
+        self._prom_path = None
+        self._trace_lines = []
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._run_id = None
+
+    def configure(self, trace_path: str = None, prometheus_path: str = None) -> None:
+        self._trace_path = trace_path
+        self._prom_path = prometheus_path
+        self.enabled = bool(trace_path or prometheus_path)
+        self._run_id = f"{int(time.time())}-{os.getpid()}"
+
+    def span(self, stage: str, trace: bool = True, **labels):
+        """Time a block; recorded in the stage histogram and (if trace) the trace file."""
+        if not self.enabled:
+            return nullcontext(_NULL_SPAN)
+        return _Span(self, stage, labels, trace)
+
+    def event(self, name: str, /, **fields) -> None:
+        if not self.enabled or not self._trace_path:
+            return
+        record = {"ts": round(time.time(), 6), "run": self._run_id, "event": name}
+        record.update((k, v) for k, v in fields.items() if v is not None)
+        with self._lock:
+            self._trace_lines.append(json.dumps(record, default=str))
+
+    def incr(self, name: str, /, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, /, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, _labels_key(labels))] = value
+
+    def observe(self, name: str, /, seconds: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    hist[0][i] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {k: (list(v[0]), v[1], v[2]) for k, v in self._histograms.items()}
+
+        def _header(name, kind):
+            if _HELP.get(name):
+                lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({n for n, _ in series}):
+                _header(name, kind)
+                for (n, key), value in sorted(series.items()):
+                    if n == name:
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name in sorted({n for n, _ in histograms}):
+            _header(name, "histogram")
+            for (n, key), (buckets, total, count) in sorted(histograms.items()):
+                if n != name:
+                    continue
+                for bound, c in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', repr(bound)),))} {c}")
+                lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """Append the trace and (re)write the Prometheus file atomically."""
+        if not self.enabled:
+            return
+        self.gauge("digest_last_run_timestamp_seconds", int(time.time()))
+        with self._lock:
+            trace_lines, self._trace_lines = self._trace_lines, []
+        try:
+            if self._trace_path and trace_lines:
+                with open(self._trace_path, "a") as f:
+                    f.write("\n".join(trace_lines) + "\n")
+            if self._prom_path:
+                tmp = f"{self._prom_path}.{os.getpid()}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(self.render_prometheus())
+                os.replace(tmp, self._prom_path)
+        except OSError:
+            pass
+
+
+class _NullSpan:
+    """Stand-in for _Span when metrics are off; setting fields on it is harmless."""
+    __slots__ = ("fields",)
+
+    def __init__(self):
+        self.fields = {}
+
+_NULL_SPAN = _NullSpan()
+
+# Shared by the whole process; sports_digest configures it from config.json.
+METRICS = Metrics()
@@ -1,6 +1,31 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: only threads in this process are serialized
+    fcntl = None
+
 import requests
 
+from metrics import METRICS
+from replay import attach_recorder
+
 DISCORD_MAX = 2000  # Discord message character limit
+EMBED_DESCRIPTION_MAX = 4096
+EMBED_TITLE_MAX = 256
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS_PER_MESSAGE = 6000  # combined limit across all embeds in one message
+EMBED_COLOR = 0x5865F2
+
+MAX_SEND_ATTEMPTS = 3
+MAX_RETRY_AFTER_SECONDS = 30  # longer waits go to the outbox instead
+OUTBOX_FILE = str(Path(__file__).resolve().parent / ".discord_outbox.jsonl")
+OUTBOX_MAX_AGE_SECONDS = 24 * 60 * 60  # yesterday's digest isn't worth replaying
 
 def _split_message(text: str, limit: int = DISCORD_MAX):
     text = (text or "").strip()
@@ -19,10 +44,320 @@ def _split_message(text: str, limit: int = DISCORD_MAX):
         parts.append(remaining)
     return parts
 
-def send_discord_webhook(webhook_url: str, body: str):
-    if not webhook_url or "discord.com/api/webhooks" not in webhook_url:
+def _pack_embeds(body: str, title: str = None) -> list:
+    """
+    Pack the digest into as few webhook payloads as possible: lines fill an
+    embed up to 4096 characters, embeds fill a message up to 10 embeds and
+    6000 characters in total.
+    """
+    title = (title or "")[:EMBED_TITLE_MAX]
+    messages = []
+    embeds, used = [], len(title)
+    lines, size = [], 0
+
+    def _close_embed():
+        nonlocal lines, size, used
+        embed = {"description": "\n".join(lines).strip("\n") or "\u200b", "color": EMBED_COLOR}
+        if not messages and not embeds and title:
+            embed["title"] = title
+        embeds.append(embed)
+        used += size
+        lines, size = [], 0
+
+    def _close_message():
+        nonlocal embeds, used
+        messages.append({"embeds": embeds})
+        embeds, used = [], 0
+
+    for line in (body or "").strip().split("\n"):
+        pieces = _split_message(line, EMBED_DESCRIPTION_MAX) if len(line) > EMBED_DESCRIPTION_MAX else [line]
+        for piece in pieces:
+            extra = len(piece) + (1 if lines else 0)
+            if size + extra > EMBED_DESCRIPTION_MAX or used + size + extra > EMBED_CHARS_PER_MESSAGE:
+                if lines:
+                    _close_embed()
+                if len(embeds) == EMBEDS_PER_MESSAGE or used + len(piece) > EMBED_CHARS_PER_MESSAGE:
+                    _close_message()
+                extra = len(piece)
+            lines.append(piece)
+            size += extra
+    _close_embed()
+    _close_message()
+    return messages
+
+def _validate_webhook_url(webhook_url: str) -> None:
+    # Any /api/webhooks/ URL is accepted so a local stand-in server can be used.
+    if not webhook_url or "/api/webhooks/" not in webhook_url:
         raise ValueError("Webhook URL looks invalid — check config.json")
 
-    for chunk in _split_message(body):
-        r = requests.post(webhook_url, json={"content": chunk}, timeout=20)
-        r.raise_for_status()
+
+class DeliveryFailed(Exception):
+    pass
+
+
+class _RateLimits:
+    """
+    Tracks Discord's X-RateLimit-* headers per bucket (falling back to the
+    webhook URL) and makes callers wait until the bucket has capacity again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bucket_for_url = {}
+        self._blocked_until = {}
+        self._global_until = 0.0
+
+    def wait(self, url: str) -> None:
+        with self._lock:
+            key = self._bucket_for_url.get(url, url)
+            until = max(self._blocked_until.get(key, 0.0), self._global_until)
+        delay = until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, url: str, r: requests.Response) -> None:
+        h = r.headers
+        with self._lock:
+            key = h.get("X-RateLimit-Bucket") or self._bucket_for_url.get(url, url)
+            self._bucket_for_url[url] = key
+            try:
+                remaining = int(h.get("X-RateLimit-Remaining", "1"))
+                reset_after = float(h.get("X-RateLimit-Reset-After", "0"))
+            except ValueError:
+                return
+            if remaining <= 0:
+                self._blocked_until[key] = time.monotonic() + reset_after
+
+    def block(self, url: str, seconds: float, is_global: bool) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            if is_global:
+                self._global_until = max(self._global_until, until)
+            else:
+                key = self._bucket_for_url.get(url, url)
+                self._blocked_until[key] = max(self._blocked_until.get(key, 0.0), until)
+
+
+class Outbox:
+    """
+    Append-only JSON-lines file of payloads that could not be delivered.
+    A later run replays them (oldest first) before posting anything new.
+    Appends and replays also take an flock on <path>.lock, because cron
+    runs can overlap and must not replay (or drop) each other's payloads.
+    """
+
+    def __init__(self, path: str = OUTBOX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self, blocking: bool = True):
+        """
+        Hold the outbox exclusively across processes. Yields False instead
+        of waiting when blocking is False and another process holds it.
+        """
+        if fcntl is None:
+            yield True
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, webhook_url: str, payloads: list) -> None:
+        now = int(time.time())
+        lines = "".join(
+            json.dumps({"webhook_url": webhook_url, "payload": p, "ts": now}) + "\n" for p in payloads
+        )
+        with self.locked(), self._lock, open(self.path, "a") as f:
+            f.write(lines)
+
+    def pending(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        items = []
+        with self._lock, open(self.path, "r") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    continue
+        return items
+
+    def replace(self, items: list) -> None:
+        with self._lock:
+            if not items:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                for item in items:
+                    f.write(json.dumps(item) + "\n")
+            os.replace(tmp, self.path)
+
+
+class DiscordDelivery:
+    """
+    Webhook delivery over one pooled session, honouring Discord's rate-limit
+    headers and 429 retry_after. Messages that still fail are kept in the
+    outbox rather than dropped.
+    """
+
+    def __init__(self, outbox: Outbox = None, session: requests.Session = None):
+        self.session = session or requests.Session()
+        attach_recorder(self.session)
+        self.outbox = outbox or Outbox()
+        self.rate_limits = _RateLimits()
+
+    def post(self, webhook_url: str, payload: dict) -> dict:
+        """POST one payload (with ?wait=true so Discord returns the message). Raises DeliveryFailed."""
+        return self._request("POST", webhook_url, webhook_url, payload, params={"wait": "true"})
+
+    def edit(self, webhook_url: str, message_id: str, payload: dict) -> dict:
+        """PATCH a message this webhook posted earlier. Raises DeliveryFailed."""
+        url = f"{webhook_url.split('?')[0].rstrip('/')}/messages/{message_id}"
+        return self._request("PATCH", webhook_url, url, payload)
+
+    def _request(self, method: str, webhook_url: str, url: str, payload: dict, params: dict = None) -> dict:
+        # Rate limits are tracked per webhook; edits share the webhook's bucket.
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            self.rate_limits.wait(webhook_url)
+            t0 = time.perf_counter()
+            try:
+                r = self.session.request(method, url, params=params, json=payload, timeout=20)
+            except requests.RequestException as e:
+                METRICS.incr("digest_discord_requests_total", method=method, status="error")
+                if attempt == MAX_SEND_ATTEMPTS:
+                    raise DeliveryFailed(str(e))
+                time.sleep(attempt)
+                continue
+
+            METRICS.observe("digest_discord_request_duration_seconds", time.perf_counter() - t0, method=method)
+            METRICS.incr("digest_discord_requests_total", method=method, status=r.status_code)
+            self.rate_limits.update(webhook_url, r)
+            if r.status_code == 429:
+                try:
+                    info = r.json()
+                except ValueError:
+                    info = {}
+                retry_after = float(info.get("retry_after") or r.headers.get("Retry-After") or 1)
+                if retry_after > MAX_RETRY_AFTER_SECONDS or attempt == MAX_SEND_ATTEMPTS:
+                    raise DeliveryFailed(f"429 rate-limited (retry_after={retry_after})")
+                self.rate_limits.block(webhook_url, retry_after, bool(info.get("global")))
+                continue
+            if r.status_code >= 500 and attempt < MAX_SEND_ATTEMPTS:
+                time.sleep(attempt)
+                continue
+            if r.status_code >= 400:
+                raise DeliveryFailed(f"HTTP {r.status_code}: {r.text[:200]}")
+            try:
+                return r.json()
+            except ValueError:
+                return {}
+        raise DeliveryFailed("Rate limited")
+
+    def send(self, webhook_url: str, payloads: list) -> dict:
+        """
+        Deliver payloads in order. On the first failure, that payload and
+        everything after it are queued in the outbox.
+        Returns {"message_ids": [...], "queued": n}.
+        """
+        message_ids = []
+        for i, payload in enumerate(payloads):
+            try:
+                message = self.post(webhook_url, payload)
+            except DeliveryFailed:
+                self.outbox.append(webhook_url, payloads[i:])
+                return {"message_ids": message_ids, "queued": len(payloads) - i}
+            message_ids.append(message.get("id"))
+        return {"message_ids": message_ids, "queued": 0}
+
+    def flush_outbox(self) -> int:
+        """
+        Replay queued payloads from earlier runs. Returns how many were delivered.
+        If another process is already replaying, leaves the outbox to it.
+        """
+        with self.outbox.locked(blocking=False) as acquired:
+            if not acquired:
+                return 0
+            return self._replay_outbox()
+
+    def _replay_outbox(self) -> int:
+        # Caller holds the outbox lock from the read until the rewrite.
+        pending = self.outbox.pending()
+        if not pending:
+            return 0
+        now = int(time.time())
+        keep, delivered, failed_urls = [], 0, set()
+        for item in pending:
+            url = item.get("webhook_url")
+            if now - item.get("ts", 0) > OUTBOX_MAX_AGE_SECONDS:
+                continue
+            # Keep per-webhook order: once one fails, hold the rest for that webhook.
+            if url in failed_urls:
+                keep.append(item)
+                continue
+            try:
+                self.post(url, item["payload"])
+                delivered += 1
+            except DeliveryFailed:
+                failed_urls.add(url)
+                keep.append(item)
+        self.outbox.replace(keep)
+        return delivered
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def send_discord_webhook(webhook_url: str, body: str, title: str = None,
+                         delivery: DiscordDelivery = None) -> dict:
+    """
+    Post a digest as embeds. Undelivered messages are queued in the outbox
+    for the next run instead of being lost.
+    Returns {"message_ids": [...], "queued": n}.
+    """
+    _validate_webhook_url(webhook_url)
+
+    payloads = _pack_embeds(body, title)
+    if delivery is not None:
+        return delivery.send(webhook_url, payloads)
+    with DiscordDelivery() as d:
+        return d.send(webhook_url, payloads)
+
+def edit_discord_webhook(webhook_url: str, message_ids: list, body: str, title: str = None,
+                         delivery: DiscordDelivery = None) -> list:
+    """
+    Replace a digest posted earlier by editing its messages in place. Extra
+    messages are posted if the digest grew; leftovers are blanked if it shrank.
+    Returns the message ids now in use. Raises DeliveryFailed (nothing is queued).
+    """
+    _validate_webhook_url(webhook_url)
+
+    payloads = _pack_embeds(body, title)
+    if delivery is None:
+        with DiscordDelivery() as d:
+            return edit_discord_webhook(webhook_url, message_ids, body, title, d)
+
+    ids = list(message_ids)
+    for i, payload in enumerate(payloads):
+        if i < len(ids):
+            delivery.edit(webhook_url, ids[i], payload)
+        else:
+            ids.append(delivery.post(webhook_url, payload).get("id"))
+    for message_id in ids[len(payloads):]:
+        delivery.edit(webhook_url, message_id, {"embeds": [{"description": "\u200b", "color": EMBED_COLOR}]})
+    return ids
@@ -0,0 +1,312 @@
+"""
+Record/replay harness for offline runs and benchmarks.
+
+Recording: set DIGEST_RECORD_DIR and run the digest as usual. Every
+successful TheSportsDB response and Discord webhook call made through
+sports.py and notify_discord.py is appended to <dir>/fixtures.jsonl.
+
+Replay: StandInServer serves those fixtures (or synthetic ones) over HTTP,
+with optional latency, 429s and errors, and also acts as a Discord webhook.
+Point the digest at it with SPORTSDB_BASE_URL and a webhook URL from
+server.webhook_url.
+
+    python replay.py serve --fixtures recordings/ --latency 0.05 --rate-429 0.1
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+RECORD_DIR_ENV = "DIGEST_RECORD_DIR"
+FIXTURES_FILE = "fixtures.jsonl"
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After",
+                 "X-RateLimit-Bucket", "X-RateLimit-Remaining", "X-RateLimit-Reset-After")
+
+def _fixture_key(method: str, path: str, query: dict) -> str:
+    # The API key is part of TheSportsDB's path; only the endpoint name matters.
+    endpoint = "webhook" if "/api/webhooks/" in path else path.rstrip("/").rsplit("/", 1)[-1]
+    if endpoint == "webhook":
+        query = {}
+    return f"{method.upper()} {endpoint}?{'&'.join(f'{k}={v}' for k, v in sorted(query.items()))}"
+
+
+# --- Recording ---
+
+class Recorder:
+    """
+    requests response hook that appends every successful exchange to
+    fixtures.jsonl. 304s (empty bodies a cold replay can't use), 429s and
+    errors are not recorded.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, FIXTURES_FILE)
+        self._lock = threading.Lock()
+
+    def hook(self, r, *args, **kwargs):
+        if not 200 <= r.status_code < 300:
+            return r
+        url = urlparse(r.request.url)
+        query = dict(parse_qsl(url.query))
+        query.pop("wait", None)
+        record = {
+            "key": _fixture_key(r.request.method, url.path, query),
+            "status": r.status_code,
+            "headers": {h: r.headers[h] for h in _KEPT_HEADERS if h in r.headers},
+            "body": r.text,
+            "elapsed": r.elapsed.total_seconds(),
+        }
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        return r
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+def attach_recorder(session) -> None:
+    """Record this session's traffic if DIGEST_RECORD_DIR is set; otherwise a no-op."""
+    directory = os.environ.get(RECORD_DIR_ENV)
+    if not directory:
+        return
+    with _recorders_lock:
+        recorder = _recorders.setdefault(directory, Recorder(directory))
+    session.hooks["response"].append(recorder.hook)
+
+def fixtures_date(fixtures: dict):
+    """The latest eventsday.php date in a set of fixtures (the day a recording was made), or None."""
+    days = []
+    for key in fixtures:
+        if key.startswith("GET eventsday.php?"):
+            query = dict(parse_qsl(key.split("?", 1)[1]))
+            try:
+                days.append(date.fromisoformat(query.get("d", "")))
+            except ValueError:
+                continue
+    return max(days) if days else None
+
+def load_fixtures(directory: str) -> dict:
+    """{fixture key: record}; the last successful recording of a key wins."""
+    fixtures = {}
+    with open(os.path.join(directory, FIXTURES_FILE), "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            # Recordings made before the recorder skipped them may hold 304s/429s/errors.
+            if not record["key"].endswith("webhook?") and 200 <= record.get("status", 200) < 300:
+                fixtures[record["key"]] = record
+    return fixtures
+
+
+# --- Synthetic schedules ---
+
+def synthetic_leagues(count: int) -> dict:
+    """A LEAGUES-shaped dict of made-up leagues."""
+    return {f"🏟️ League {i}": (900000 + i, f"Synthetic League {i}") for i in range(count)}
+
+def synthetic_fixtures(leagues: dict, events_per_league: int, day: date = None) -> dict:
+    """
+    Fixtures for eventsday/eventspastleague/eventsnextleague/eventsseason covering `day`:
+    half of each league's games already final, half still to come.
+    """
+    day = day or date.today()
+    fixtures = {}
+    eid = itertools.count(1)
+    for league_id, api_name in leagues.values():
+        events = []
+        for i in range(events_per_league):
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=12, minutes=7 * i)
+            final = i % 2 == 0
+            events.append({
+                "idEvent": str(next(eid)), "idLeague": str(league_id),
+                "strEvent": f"Home {i} vs Away {i}",
+                "strHomeTeam": f"Home Team {league_id}-{i}", "strAwayTeam": f"Away Team {league_id}-{i}",
+                "idHomeTeam": str(league_id * 1000 + 2 * i), "idAwayTeam": str(league_id * 1000 + 2 * i + 1),
+                "intHomeScore": str(100 + i) if final else None, "intAwayScore": str(90 + i) if final else None,
+                "dateEvent": start.strftime("%Y-%m-%d"), "strTime": start.strftime("%H:%M:%S"),
+                "strStatus": "FT" if final else "NS", "strSeason": str(day.year),
+                # Ballast the real API also sends; trimmed away at ingest.
+                "strDescriptionEN": "x" * 400, "strThumb": "https://example.invalid/thumb.jpg",
+            })
+        past = [e for e in events if e["strStatus"] == "FT"]
+        upcoming = [e for e in events if e["strStatus"] != "FT"]
+        for key, payload in (
+            (_fixture_key("GET", "/eventsday.php", {"d": day.isoformat(), "l": api_name}), events),
+            (_fixture_key("GET", "/eventspastleague.php", {"id": str(league_id)}), past),
+            (_fixture_key("GET", "/eventsnextleague.php", {"id": str(league_id)}), upcoming),
+            (_fixture_key("GET", "/eventsseason.php", {"id": str(league_id), "s": str(day.year)}), events),
+        ):
+            body = json.dumps({"events": payload or None})
+            fixtures[key] = {
+                "key": key, "status": 200, "body": body,
+                "headers": {"Content-Type": "application/json",
+                            "ETag": '"%s"' % hashlib.sha1(body.encode()).hexdigest()[:16]},
+            }
+    return fixtures
+
+
+# --- Stand-in server ---
+
+class StandInServer:
+    """
+    Local HTTP server that replays fixtures as TheSportsDB and accepts
+    Discord webhook POST/PATCH calls. Counts requests and bytes sent.
+    """
+
+    def __init__(self, fixtures: dict, latency: float = 0.0, rate_429: float = 0.0,
+                 error_rate: float = 0.0, port: int = 0, seed: int = 0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.stats = {}
+        self.reset_stats()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/api/v1/json"
+
+    @property
+    def webhook_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/api/webhooks/0/standin"
+
+    def reset_stats(self) -> None:
+        self.stats = {"api_requests": 0, "webhook_requests": 0, "bytes": 0,
+                      "status_304": 0, "status_429": 0, "errors": 0}
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes = b"", headers: dict = None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                server._count(bytes=len(body))
+
+            def _faults(self) -> bool:
+                if server.latency:
+                    time.sleep(server.latency)
+                roll = server._roll()
+                if roll < server.rate_429:
+                    server._count(status_429=1)
+                    self._reply(429, b'{"retry_after": 0.1, "global": false}',
+                                {"Retry-After": "0", "Content-Type": "application/json"})
+                    return True
+                if roll < server.rate_429 + server.error_rate:
+                    server._count(errors=1)
+                    self._reply(503, b"stand-in error")
+                    return True
+                return False
+
+            def do_GET(self):
+                server._count(api_requests=1)
+                if self._faults():
+                    return
+                url = urlparse(self.path)
+                fixture = server.fixtures.get(_fixture_key("GET", url.path, dict(parse_qsl(url.query))))
+                if fixture is None:
+                    self._reply(200, b'{"events": null}', {"Content-Type": "application/json"})
+                    return
+                headers = dict(fixture.get("headers") or {})
+                etag = headers.get("ETag")
+                if etag and self.headers.get("If-None-Match") == etag:
+                    server._count(status_304=1)
+                    self._reply(304, b"", {"ETag": etag})
+                    return
+                self._reply(fixture.get("status", 200), fixture["body"].encode(), headers)
+
+            def _webhook(self):
+                server._count(webhook_requests=1)
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                if self._faults():
+                    return
+                body = json.dumps({"id": str(next(server._message_ids))}).encode()
+                self._reply(200, body, {"Content-Type": "application/json",
+                                        "X-RateLimit-Bucket": "standin",
+                                        "X-RateLimit-Remaining": "4",
+                                        "X-RateLimit-Reset-After": "0.5"})
+
+            do_POST = _webhook
+            do_PATCH = _webhook
+
+        return Handler
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic fixtures locally.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the stand-in TheSportsDB/Discord server")
+    serve.add_argument("--fixtures", help="directory containing fixtures.jsonl (default: synthetic)")
+    serve.add_argument("--leagues", type=int, default=0,
+                       help="synthetic leagues (default: the real LEAGUES table)")
+    serve.add_argument("--events", type=int, default=10, help="synthetic events per league")
+    serve.add_argument("--port", type=int, default=8099)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        from sports import LEAGUES
+        leagues = synthetic_leagues(args.leagues) if args.leagues else LEAGUES
+        fixtures = synthetic_fixtures(leagues, args.events)
+    server = StandInServer(fixtures, args.latency, args.rate_429, args.error_rate, args.port).start()
+    print(f"Serving {len(fixtures)} fixtures")
+    print(f"  SPORTSDB_BASE_URL={server.base_url}")
+    print(f"  webhook_url={server.webhook_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
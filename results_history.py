@@ -0,0 +1,277 @@
+"""
+Local history of final results, kept in SQLite and indexed by date, league
+and team id, so records, streaks and head-to-heads never need an API call.
+
+Every fresh TheSportsDB payload the fetch layer receives is written through
+(only completed games are kept); past seasons are bulk-imported
+with the backfill command.
+
+    python results_history.py backfill --seasons 2024 2025
+    python results_history.py last Knicks -n 10
+    python results_history.py h2h Knicks Celtics --season 2025-2026
+"""
+import argparse
+import json
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+
+from events import Event
+
+# Column order matches Event.to_record(), so rows load with Event.from_record().
+_COLUMNS = ("event_id", "league_id", "name", "home", "away", "home_id", "away_id",
+            "home_score", "away_score", "date", "start", "season", "status")
+_SELECT = ", ".join(_COLUMNS)
+
+
+class TeamForm:
+    """A team's record and current streak over some set of results."""
+
+    __slots__ = ("wins", "losses", "draws", "streak")
+
+    def __init__(self, wins=0, losses=0, draws=0, streak=""):
+        self.wins = wins
+        self.losses = losses
+        self.draws = draws
+        self.streak = streak  # e.g. "W3"; "" without results
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.losses + self.draws
+
+    def __str__(self):
+        record = f"{self.wins}-{self.losses}" + (f"-{self.draws}" if self.draws else "")
+        return f"{record} {self.streak}" if self.streak else record
+
+
+def _is_result(event: Event) -> bool:
+    """A finished team game with a final score. Live scores and called-off games are not results."""
+    if not (event.has_final_score and event.is_team_game and event.home_id and event.away_id and event.date):
+        return False
+    if event.status:
+        return event.is_completed
+    # Older season payloads often carry scores without a status.
+    return event.date < date.today()
+
+def _outcome(event: Event, team_id: str) -> str:
+    """'W', 'L' or 'D' for team_id in a finished event."""
+    if event.home_score == event.away_score:
+        return "D"
+    home_won = event.home_score > event.away_score
+    return "W" if home_won == (event.home_id == team_id) else "L"
+
+
+class ResultsHistory:
+    """
+    SQLite results store in WAL mode. One row per finished team game, with
+    indexes on date, (league, date) and each side's (team id, date); a small
+    teams table maps names to TheSportsDB team ids.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Written from the fetch worker threads; access is serialized by _lock.
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                event_id   TEXT PRIMARY KEY,
+                league_id  INTEGER,
+                name       TEXT,
+                home       TEXT,
+                away       TEXT,
+                home_id    TEXT NOT NULL,
+                away_id    TEXT NOT NULL,
+                home_score INTEGER NOT NULL,
+                away_score INTEGER NOT NULL,
+                date       TEXT NOT NULL,
+                start      INTEGER,
+                season     TEXT,
+                status     TEXT
+            );
+            CREATE INDEX IF NOT EXISTS results_date ON results (date);
+            CREATE INDEX IF NOT EXISTS results_league_date ON results (league_id, date);
+            CREATE INDEX IF NOT EXISTS results_home ON results (home_id, date);
+            CREATE INDEX IF NOT EXISTS results_away ON results (away_id, date);
+            CREATE TABLE IF NOT EXISTS teams (
+                team_id   TEXT PRIMARY KEY,
+                name      TEXT NOT NULL,
+                league_id INTEGER
+            );
+        """)
+
+    def record(self, events) -> int:
+        """
+        Upsert the finished team games among events in one transaction, and
+        drop any stored game that has since been called off.
+        Returns the number of rows inserted, changed or removed.
+        """
+        events = list(events)
+        rows = [e.to_record() for e in events if _is_result(e)]
+        called_off = [(e.id,) for e in events if e.is_finished and not e.is_completed]
+        if not rows and not called_off:
+            return 0
+        teams = {}
+        for r in rows:
+            teams[r[5]] = (r[5], r[3], r[1])
+            teams[r[6]] = (r[6], r[4], r[1])
+        updates = ", ".join(f"{c} = excluded.{c}" for c in _COLUMNS[1:])
+        changed = " OR ".join(f"{c} IS NOT excluded.{c}" for c in ("home_score", "away_score", "date", "status"))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    f"INSERT INTO results ({_SELECT}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+                    f"ON CONFLICT(event_id) DO UPDATE SET {updates} WHERE {changed}",
+                    rows,
+                )
+                self._conn.executemany("DELETE FROM results WHERE event_id = ?", called_off)
+                stored = self._conn.total_changes - before
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO teams (team_id, name, league_id) VALUES (?, ?, ?)",
+                    teams.values(),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return stored
+
+    def _query(self, sql: str, params) -> list:
+        with self._lock:
+            events = [Event.from_record(list(row)) for row in self._conn.execute(sql, params)]
+        # Rows written before status checking may hold live scores; never count them.
+        return [e for e in events if not e.status or e.is_completed]
+
+    def last_results(self, team_id: str, n: int = 10, before=None, season: str = None) -> list:
+        """A team's most recent results (newest first), optionally before a date / within a season."""
+        where = "date < ?" + (" AND season = ?" if season else "")
+        args = [before.isoformat() if before else "9999-12-31"] + ([season] if season else [])
+        sql = (f"SELECT {_SELECT} FROM results WHERE home_id = ? AND {where} "
+               f"UNION ALL SELECT {_SELECT} FROM results WHERE away_id = ? AND {where} "
+               f"ORDER BY date DESC, start DESC")
+        params = [team_id, *args, team_id, *args]
+        if n:
+            sql += " LIMIT ?"
+            params.append(n)
+        return self._query(sql, params)
+
+    def head_to_head(self, team_a: str, team_b: str, season: str = None) -> list:
+        """Every stored meeting of two teams (newest first)."""
+        sql = (f"SELECT {_SELECT} FROM results WHERE home_id = ? AND away_id = ? "
+               f"UNION ALL SELECT {_SELECT} FROM results WHERE home_id = ? AND away_id = ?")
+        params = [team_a, team_b, team_b, team_a]
+        if season:
+            sql = f"SELECT * FROM ({sql}) WHERE season = ?"
+            params.append(season)
+        return self._query(sql + " ORDER BY date DESC, start DESC", params)
+
+    def results_on(self, day, league_id: int = None) -> list:
+        if league_id is None:
+            return self._query(f"SELECT {_SELECT} FROM results WHERE date = ?", [day.isoformat()])
+        return self._query(f"SELECT {_SELECT} FROM results WHERE league_id = ? AND date = ?",
+                           [league_id, day.isoformat()])
+
+    def team_form(self, team_id: str, before=None, season: str = None, n: int = None) -> TeamForm:
+        """Record and current streak from a team's results before a date (season-only if given)."""
+        form = TeamForm()
+        for i, event in enumerate(self.last_results(team_id, n, before, season)):
+            outcome = _outcome(event, team_id)
+            if outcome == "W":
+                form.wins += 1
+            elif outcome == "L":
+                form.losses += 1
+            else:
+                form.draws += 1
+            if i == 0:
+                form.streak = f"{outcome}1"
+            elif form.streak and form.streak[0] == outcome and int(form.streak[1:]) == i:
+                form.streak = f"{outcome}{i + 1}"
+        return form
+
+    def find_teams(self, name: str, league_id: int = None) -> list:
+        """[(team_id, name, league_id)] whose name is name or ends with it ("Knicks")."""
+        sql = "SELECT team_id, name, league_id FROM teams WHERE (name = ? COLLATE NOCASE OR name LIKE ?)"
+        params = [name, f"% {name}"]
+        if league_id is not None:
+            sql += " AND league_id = ?"
+            params.append(league_id)
+        with self._lock:
+            return self._conn.execute(sql + " ORDER BY name", params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- CLI ---
+
+def _resolve_team(history: ResultsHistory, name: str) -> tuple:
+    matches = history.find_teams(name)
+    if not matches:
+        raise SystemExit(f"No stored results for a team called {name!r} (run backfill first?)")
+    if len(matches) > 1:
+        options = ", ".join(f"{n} [{tid}]" for tid, n, _ in matches)
+        raise SystemExit(f"{name!r} is ambiguous: {options}")
+    return matches[0]
+
+def _print_results(events: list, team_id: str = None) -> None:
+    for e in events:
+        outcome = f"{_outcome(e, team_id)}  " if team_id else ""
+        print(f"{e.date}  {outcome}{e.away} {e.away_score} @ {e.home} {e.home_score}")
+
+def main(argv=None):
+    import sports
+
+    parser = argparse.ArgumentParser(description="Query or backfill the local results history.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="bulk-import past seasons (one request per league and season)")
+    backfill.add_argument("--seasons", nargs="+", required=True,
+                          help='season names or start years, e.g. 2024 or 2024-2025')
+    backfill.add_argument("--leagues", nargs="+", help="API league names (default: every league in LEAGUES)")
+    last = sub.add_parser("last", help="a team's most recent results")
+    last.add_argument("team")
+    last.add_argument("-n", type=int, default=10)
+    h2h = sub.add_parser("h2h", help="head-to-head results of two teams")
+    h2h.add_argument("team")
+    h2h.add_argument("opponent")
+    h2h.add_argument("--season")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        with open(Path(__file__).resolve().parent / "config.json", "r") as f:
+            settings = json.load(f).get("settings", {})
+        stored = sports.backfill_history(
+            settings.get("sportsdb_api_key", "123"), args.seasons, args.leagues,
+            rate_per_second=settings.get("requests_per_second"), burst=settings.get("request_burst"),
+        )
+        for league, count in stored.items():
+            print(f"{league}: {count} result(s) stored")
+        return
+
+    with ResultsHistory(sports.HISTORY_DB_FILE) as history:
+        team_id, team_name, _ = _resolve_team(history, args.team)
+        if args.command == "last":
+            results = history.last_results(team_id, args.n)
+            print(f"{team_name}: {history.team_form(team_id, n=args.n)} in the last {len(results)}")
+            _print_results(results, team_id)
+        else:
+            opp_id, opp_name, _ = _resolve_team(history, args.opponent)
+            results = history.head_to_head(team_id, opp_id, args.season)
+            wins = sum(1 for e in results if _outcome(e, team_id) == "W")
+            losses = sum(1 for e in results if _outcome(e, team_id) == "L")
+            print(f"{team_name} vs {opp_name}: {wins}-{losses} in {len(results)} meeting(s)")
+            _print_results(results, team_id)
+
+if __name__ == "__main__":
+    main()
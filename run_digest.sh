@@ -12,7 +12,7 @@ if [ ! -f "$PY" ]; then
   PY="/usr/bin/python3"
 fi
 
-$PY "$PROJECT_DIR/sports_digest.py" >> "$LOG" 2>&1
+$PY "$PROJECT_DIR/sports_digest.py" "$@" >> "$LOG" 2>&1
 STATUS=$?
 
 if [ $STATUS -eq 0 ]; then
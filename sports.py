@@ -1,58 +1,77 @@
-import json
 import os
 import time
 import random
+import threading
 import requests
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+from cache_store import CacheStore, open_cache
+from events import Event, ScheduleIndex, events_from_payload, trim_payload
+from league_activity import LeagueActivity
+from metrics import METRICS
+from replay import attach_recorder
+from results_history import ResultsHistory
+
 _SCRIPT_DIR = Path(__file__).resolve().parent
 
 # --- Team abbreviations ---
+# Keyed by the LEAGUES API league name so team lookups can be scoped per league
+# ("Giants" is a different team in the NFL and MLB).
+TEAM_ABBREVS_BY_LEAGUE = {
+    "NBA": {
+        "Atlanta Hawks": "ATL", "Boston Celtics": "BOS", "Brooklyn Nets": "BKN",
+        "Charlotte Hornets": "CHA", "Chicago Bulls": "CHI", "Cleveland Cavaliers": "CLE",
+        "Dallas Mavericks": "DAL", "Denver Nuggets": "DEN", "Detroit Pistons": "DET",
+        "Golden State Warriors": "GSW", "Houston Rockets": "HOU", "Indiana Pacers": "IND",
+        "Los Angeles Clippers": "LAC", "Los Angeles Lakers": "LAL", "Memphis Grizzlies": "MEM",
+        "Miami Heat": "MIA", "Milwaukee Bucks": "MIL", "Minnesota Timberwolves": "MIN",
+        "New Orleans Pelicans": "NOP", "New York Knicks": "NYK", "Oklahoma City Thunder": "OKC",
+        "Orlando Magic": "ORL", "Philadelphia 76ers": "PHI", "Phoenix Suns": "PHX",
+        "Portland Trail Blazers": "POR", "Sacramento Kings": "SAC", "San Antonio Spurs": "SAS",
+        "Toronto Raptors": "TOR", "Utah Jazz": "UTA", "Washington Wizards": "WAS",
+    },
+    "NFL": {
+        "Arizona Cardinals": "ARI", "Atlanta Falcons": "ATL", "Baltimore Ravens": "BAL",
+        "Buffalo Bills": "BUF", "Carolina Panthers": "CAR", "Chicago Bears": "CHI",
+        "Cincinnati Bengals": "CIN", "Cleveland Browns": "CLE", "Dallas Cowboys": "DAL",
+        "Denver Broncos": "DEN", "Detroit Lions": "DET", "Green Bay Packers": "GB",
+        "Houston Texans": "HOU", "Indianapolis Colts": "IND", "Jacksonville Jaguars": "JAX",
+        "Kansas City Chiefs": "KC", "Las Vegas Raiders": "LV", "Los Angeles Chargers": "LAC",
+        "Los Angeles Rams": "LAR", "Miami Dolphins": "MIA", "Minnesota Vikings": "MIN",
+        "New England Patriots": "NE", "New Orleans Saints": "NO", "New York Giants": "NYG",
+        "New York Jets": "NYJ", "Philadelphia Eagles": "PHI", "Pittsburgh Steelers": "PIT",
+        "San Francisco 49ers": "SF", "Seattle Seahawks": "SEA", "Tampa Bay Buccaneers": "TB",
+        "Tennessee Titans": "TEN", "Washington Commanders": "WAS",
+    },
+    "MLB": {
+        "Arizona Diamondbacks": "ARI", "Atlanta Braves": "ATL", "Baltimore Orioles": "BAL",
+        "Boston Red Sox": "BOS", "Chicago Cubs": "CHC", "Chicago White Sox": "CWS",
+        "Cincinnati Reds": "CIN", "Cleveland Guardians": "CLE", "Colorado Rockies": "COL",
+        "Detroit Tigers": "DET", "Houston Astros": "HOU", "Kansas City Royals": "KC",
+        "Los Angeles Angels": "LAA", "Los Angeles Dodgers": "LAD", "Miami Marlins": "MIA",
+        "Milwaukee Brewers": "MIL", "Minnesota Twins": "MIN", "New York Mets": "NYM",
+        "New York Yankees": "NYY", "Oakland Athletics": "OAK", "Philadelphia Phillies": "PHI",
+        "Pittsburgh Pirates": "PIT", "San Diego Padres": "SD", "San Francisco Giants": "SF",
+        "Seattle Mariners": "SEA", "St. Louis Cardinals": "STL", "Tampa Bay Rays": "TB",
+        "Texas Rangers": "TEX", "Toronto Blue Jays": "TOR", "Washington Nationals": "WSH",
+    },
+    "English Premier League": {
+        "Arsenal": "ARS", "Aston Villa": "AVL", "Bournemouth": "BOU", "Brentford": "BRE",
+        "Brighton & Hove Albion": "BHA", "Brighton": "BHA", "Chelsea": "CHE",
+        "Crystal Palace": "CRY", "Everton": "EVE", "Fulham": "FUL", "Ipswich Town": "IPS",
+        "Leicester City": "LEI", "Liverpool": "LIV", "Manchester City": "MCI",
+        "Manchester United": "MUN", "Newcastle United": "NEW", "Nottingham Forest": "NFO",
+        "Southampton": "SOU", "Tottenham Hotspur": "TOT", "West Ham United": "WHU",
+        "Wolverhampton Wanderers": "WOL", "Wolverhampton": "WOL", "Sunderland":"SUN",
+    },
+}
 TEAM_ABBREVS = {
-    # NBA
-    "Atlanta Hawks": "ATL", "Boston Celtics": "BOS", "Brooklyn Nets": "BKN",
-    "Charlotte Hornets": "CHA", "Chicago Bulls": "CHI", "Cleveland Cavaliers": "CLE",
-    "Dallas Mavericks": "DAL", "Denver Nuggets": "DEN", "Detroit Pistons": "DET",
-    "Golden State Warriors": "GSW", "Houston Rockets": "HOU", "Indiana Pacers": "IND",
-    "Los Angeles Clippers": "LAC", "Los Angeles Lakers": "LAL", "Memphis Grizzlies": "MEM",
-    "Miami Heat": "MIA", "Milwaukee Bucks": "MIL", "Minnesota Timberwolves": "MIN",
-    "New Orleans Pelicans": "NOP", "New York Knicks": "NYK", "Oklahoma City Thunder": "OKC",
-    "Orlando Magic": "ORL", "Philadelphia 76ers": "PHI", "Phoenix Suns": "PHX",
-    "Portland Trail Blazers": "POR", "Sacramento Kings": "SAC", "San Antonio Spurs": "SAS",
-    "Toronto Raptors": "TOR", "Utah Jazz": "UTA", "Washington Wizards": "WAS",
-    # NFL
-    "Arizona Cardinals": "ARI", "Atlanta Falcons": "ATL", "Baltimore Ravens": "BAL",
-    "Buffalo Bills": "BUF", "Carolina Panthers": "CAR", "Chicago Bears": "CHI",
-    "Cincinnati Bengals": "CIN", "Cleveland Browns": "CLE", "Dallas Cowboys": "DAL",
-    "Denver Broncos": "DEN", "Detroit Lions": "DET", "Green Bay Packers": "GB",
-    "Houston Texans": "HOU", "Indianapolis Colts": "IND", "Jacksonville Jaguars": "JAX",
-    "Kansas City Chiefs": "KC", "Las Vegas Raiders": "LV", "Los Angeles Chargers": "LAC",
-    "Los Angeles Rams": "LAR", "Miami Dolphins": "MIA", "Minnesota Vikings": "MIN",
-    "New England Patriots": "NE", "New Orleans Saints": "NO", "New York Giants": "NYG",
-    "New York Jets": "NYJ", "Philadelphia Eagles": "PHI", "Pittsburgh Steelers": "PIT",
-    "San Francisco 49ers": "SF", "Seattle Seahawks": "SEA", "Tampa Bay Buccaneers": "TB",
-    "Tennessee Titans": "TEN", "Washington Commanders": "WAS",
-    # MLB
-    "Arizona Diamondbacks": "ARI", "Atlanta Braves": "ATL", "Baltimore Orioles": "BAL",
-    "Boston Red Sox": "BOS", "Chicago Cubs": "CHC", "Chicago White Sox": "CWS",
-    "Cincinnati Reds": "CIN", "Cleveland Guardians": "CLE", "Colorado Rockies": "COL",
-    "Detroit Tigers": "DET", "Houston Astros": "HOU", "Kansas City Royals": "KC",
-    "Los Angeles Angels": "LAA", "Los Angeles Dodgers": "LAD", "Miami Marlins": "MIA",
-    "Milwaukee Brewers": "MIL", "Minnesota Twins": "MIN", "New York Mets": "NYM",
-    "New York Yankees": "NYY", "Oakland Athletics": "OAK", "Philadelphia Phillies": "PHI",
-    "Pittsburgh Pirates": "PIT", "San Diego Padres": "SD", "San Francisco Giants": "SF",
-    "Seattle Mariners": "SEA", "St. Louis Cardinals": "STL", "Tampa Bay Rays": "TB",
-    "Texas Rangers": "TEX", "Toronto Blue Jays": "TOR", "Washington Nationals": "WSH",
-    # Premier League
-    "Arsenal": "ARS", "Aston Villa": "AVL", "Bournemouth": "BOU", "Brentford": "BRE",
-    "Brighton & Hove Albion": "BHA", "Brighton": "BHA", "Chelsea": "CHE",
-    "Crystal Palace": "CRY", "Everton": "EVE", "Fulham": "FUL", "Ipswich Town": "IPS",
-    "Leicester City": "LEI", "Liverpool": "LIV", "Manchester City": "MCI",
-    "Manchester United": "MUN", "Newcastle United": "NEW", "Nottingham Forest": "NFO",
-    "Southampton": "SOU", "Tottenham Hotspur": "TOT", "West Ham United": "WHU",
-    "Wolverhampton Wanderers": "WOL", "Wolverhampton": "WOL", "Sunderland":"SUN",
+    team: abbrev
+    for teams in TEAM_ABBREVS_BY_LEAGUE.values()
+    for team, abbrev in teams.items()
 }
 
 def _abbrev(team: str) -> str:
@@ -74,214 +93,644 @@ LEAGUES = {
 }
 
 # --- Request / cache settings ---
-REQUEST_DELAY_SECONDS = 0.15
+# All fetch workers share one token bucket: RATE_LIMIT_PER_SECOND tokens refill
+# per second, up to RATE_LIMIT_BURST banked tokens. Overridable from config.json.
+RATE_LIMIT_PER_SECOND = 6.0
+RATE_LIMIT_BURST = 6
+MAX_FETCH_WORKERS = 6
 MAX_RETRIES = 2
 MAX_429_SLEEP_SECONDS = 2
+# "sqlite" (default) or "json". The legacy JSON file is migrated into SQLite once.
+CACHE_BACKEND = "sqlite"
 CACHE_FILE = str(_SCRIPT_DIR / ".sportsdb_cache.json")
+CACHE_DB_FILE = str(_SCRIPT_DIR / ".sportsdb_cache.db")
 EVENTS_TTL_SECONDS = 60 * 60  # 1 hour
+# Final results from every fresh payload are kept here (see results_history.py).
+HISTORY_DB_FILE = str(_SCRIPT_DIR / ".results_history.db")
+
+# Per-endpoint freshness. Within "ttl" a cached payload is served as-is; up to
+# "grace" seconds past that it is served stale and revalidated in the background.
+ENDPOINT_POLICIES = {
+    "eventsday.php":        {"ttl": 30 * 60,     "grace": 6 * 60 * 60},
+    "eventspastleague.php": {"ttl": 60 * 60,     "grace": 12 * 60 * 60},
+    "eventsnextleague.php": {"ttl": 3 * 60 * 60, "grace": 24 * 60 * 60},
+    "eventsseason.php":     {"ttl": 12 * 60 * 60, "grace": 7 * 24 * 60 * 60},
+}
+# Date-range digests read each league's whole season in one eventsseason.php
+# call. Days from RESULT_SETTLE_DAYS ago up to today may still change (scores,
+# statuses), so they are re-read from eventsday.php unless the season payload
+# is itself fresher than the eventsday.php TTL.
+RESULT_SETTLE_DAYS = 1
+# Failed fetches are remembered for an escalating backoff so a 429 or an outage
+# is not re-requested on every run.
+NEGATIVE_TTL_SECONDS = [60, 5 * 60, 15 * 60, 60 * 60]
+REFRESH_WORKERS = 2
 
 def _base_url(api_key: str) -> str:
-    return f"https://thesportsdb.com/api/v1/json/{api_key}"
+    # SPORTSDB_BASE_URL points runs at a local stand-in server (see replay.py)
+    root = os.environ.get("SPORTSDB_BASE_URL", "https://thesportsdb.com/api/v1/json")
+    return f"{root.rstrip('/')}/{api_key}"
 
 # --- Cache helpers ---
 
-def _load_cache() -> dict:
-    if not os.path.exists(CACHE_FILE):
-        return {"events": {}}
+def _load_cache() -> CacheStore:
+    with METRICS.span("cache_load", backend=CACHE_BACKEND):
+        return open_cache(
+            CACHE_DB_FILE if CACHE_BACKEND == "sqlite" else CACHE_FILE,
+            backend=CACHE_BACKEND,
+            legacy_json_path=CACHE_FILE,
+        )
+
+def open_history():
+    """The results history, or None if it can't be opened (it is optional; fetching must go on)."""
     try:
-        with open(CACHE_FILE, "r") as f:
-            data = json.load(f)
-        data.setdefault("events", {})
-        return data
-    except Exception:
-        return {"events": {}}
+        with METRICS.span("history_load"):
+            return ResultsHistory(HISTORY_DB_FILE)
+    except Exception as e:
+        METRICS.event("history_error", error=repr(e)[:200])
+        print(f"⚠️ Results history unavailable: {e}")
+        return None
 
-def _save_cache(cache: dict) -> None:
+def _cache_set(cache: CacheStore, key: str, data, ttl_seconds: int = EVENTS_TTL_SECONDS,
+               meta: dict = None):
     try:
-        with open(CACHE_FILE, "w") as f:
-            json.dump(cache, f, indent=2)
+        with METRICS.span("cache_write", trace=False):
+            cache.set(key, data, ttl_seconds, meta)
     except Exception:
         pass
 
-def _cache_get(cache: dict, key: str, ttl_seconds: int):
-    now = int(time.time())
-    item = cache["events"].get(key)
-    if item and (now - item.get("ts", 0)) < ttl_seconds:
-        return item.get("data")
-    return None
-
-def _cache_set(cache: dict, key: str, data):
-    cache["events"][key] = {"data": data, "ts": int(time.time())}
-    _save_cache(cache)
-
 # --- HTTP helpers ---
 
 class RateLimited(Exception):
     pass
 
-def _request_json(session: requests.Session, url: str, params: dict):
-    time.sleep(REQUEST_DELAY_SECONDS)
+class TokenBucket:
+    """
+    Thread-safe token-bucket limiter shared by all fetch workers.
+    A 429 calls backoff(), which pauses every worker instead of each one
+    sleeping and retrying on its own.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(float(rate), 0.01)
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    elapsed = max(0.0, now - self._updated)
+                    self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def backoff(self, seconds: float) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._updated = until
+                self._tokens = 0.0
+
+def _retry_after_seconds(r: requests.Response) -> float:
+    try:
+        delay = float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        delay = 0.5 + random.random()
+    return min(MAX_429_SLEEP_SECONDS, max(delay, 0.0))
+
+def _request(session: requests.Session, url: str, params: dict, limiter: TokenBucket,
+             headers: dict = None) -> requests.Response:
+    endpoint = url.rsplit("/", 1)[-1]
     for attempt in range(1, MAX_RETRIES + 1):
-        r = session.get(url, params=params, timeout=15)
+        limiter.acquire()
+        t0 = time.perf_counter()
+        try:
+            r = session.get(url, params=params, headers=headers, timeout=15)
+        except requests.RequestException:
+            METRICS.incr("digest_http_requests_total", endpoint=endpoint, status="error")
+            raise
+        METRICS.observe("digest_http_request_duration_seconds", time.perf_counter() - t0, endpoint=endpoint)
+        METRICS.incr("digest_http_requests_total", endpoint=endpoint, status=r.status_code)
         if r.status_code == 429:
-            time.sleep(min(MAX_429_SLEEP_SECONDS, 0.5 + random.random()))
+            pause = _retry_after_seconds(r)
+            limiter.backoff(pause)
+            METRICS.incr("digest_http_429_sleep_seconds_total", pause, endpoint=endpoint)
+            METRICS.event("http_429", endpoint=endpoint, attempt=attempt, pause_s=pause)
             if attempt == MAX_RETRIES:
                 raise RateLimited(f"429 rate-limited: {r.url}")
+            METRICS.incr("digest_http_retries_total", endpoint=endpoint)
             continue
         r.raise_for_status()
-        return r.json()
+        return r
     raise RateLimited("Rate limited")
 
-# --- Parsing / formatting helpers ---
+def _make_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    attach_recorder(session)
+    return session
 
-def _parse_event_date(date_str: str):
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").date()
-    except Exception:
-        return None
+# --- Fetch policy ---
 
-def _safe_int(x):
-    try:
-        return int(x)
-    except Exception:
-        return None
+def _endpoint_policy(endpoint: str, policies: dict = None) -> dict:
+    return (policies or ENDPOINT_POLICIES).get(endpoint, {"ttl": EVENTS_TTL_SECONDS, "grace": 0})
 
-def _has_final_score(event) -> bool:
-    return (_safe_int(event.get("intHomeScore")) is not None
-            and _safe_int(event.get("intAwayScore")) is not None)
+class Fetcher:
+    """
+    Cache-aware fetch layer shared by all league workers.
+    - fresh entries are served from cache
+    - stale entries within the endpoint's grace window are served immediately
+      and revalidated in the background
+    - failures are negatively cached with an escalating backoff
+    - revalidation sends If-None-Match / If-Modified-Since when the server
+      gave us validators, so an unchanged payload costs a 304
+    - with a ResultsHistory, final scores in every new payload are written
+      through to it
+    """
 
-def _format_time_local(date_str: str, time_str: str, tz_name: str) -> str:
-    if not date_str or not time_str:
-        return ""
-    t = time_str.strip()
-    if t in ("", "00:00:00", "00:00"):
+    def __init__(self, session, base_url: str, cache: CacheStore, limiter: TokenBucket,
+                 refresh_workers: int = REFRESH_WORKERS, policies: dict = None,
+                 history: ResultsHistory = None):
+        self.session = session
+        self.base_url = base_url
+        self.cache = cache
+        self.limiter = limiter
+        self.policies = policies
+        self.history = history
+        self._refresh_pool = ThreadPoolExecutor(max_workers=max(refresh_workers, 1))
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, key: str, params: dict, league: str = None) -> dict:
+        policy = _endpoint_policy(endpoint, self.policies)
+        now = int(time.time())
+        entry = self.cache.get(key)
+        age = now - entry.get("ts", 0) if entry else None
+
+        if entry and age < policy["ttl"]:
+            METRICS.incr("digest_cache_lookups_total", endpoint=endpoint, league=league, result="fresh")
+            return entry.get("data") or {}
+
+        if self.failed_recently(key):
+            METRICS.incr("digest_cache_lookups_total", endpoint=endpoint, league=league, result="negative")
+            return (entry.get("data") or {}) if entry else {}
+
+        if entry and age < policy["ttl"] + policy["grace"]:
+            METRICS.incr("digest_cache_lookups_total", endpoint=endpoint, league=league, result="stale")
+            self._schedule_refresh(endpoint, key, params, entry, league)
+            return entry.get("data") or {}
+
+        METRICS.incr("digest_cache_lookups_total", endpoint=endpoint, league=league, result="miss")
+        data = self._revalidate(endpoint, key, params, entry, league)
+        if data is None:
+            return (entry.get("data") or {}) if entry else {}
+        return data
+
+    def failed_recently(self, key: str) -> bool:
+        """True while a failed fetch of key is inside its negative-cache backoff."""
+        neg = self.cache.get(f"neg:{key}")
+        return bool(neg) and time.time() - neg.get("ts", 0) < neg["data"].get("retry_after", 0)
+
+    def _schedule_refresh(self, endpoint, key, params, entry, league=None):
+        with self._lock:
+            if key in self._inflight:
+                return
+            self._inflight.add(key)
+
+        def _run():
+            try:
+                self._revalidate(endpoint, key, params, entry, league)
+            finally:
+                with self._lock:
+                    self._inflight.discard(key)
+
+        self._refresh_pool.submit(_run)
+
+    def _revalidate(self, endpoint, key, params, entry, league=None):
+        """Fetch (conditionally, if possible) and update the cache. Returns None on failure."""
+        policy = _endpoint_policy(endpoint, self.policies)
+        meta = (entry or {}).get("meta") or {}
+        headers = {}
+        if entry and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if entry and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            r = _request(self.session, f"{self.base_url}/{endpoint}", params, self.limiter, headers or None)
+            if r.status_code == 304 and entry:
+                data = entry.get("data")
+            else:
+                data = trim_payload(r.json())
+                meta = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+                self._record_results(data, league)
+        except Exception as exc:
+            METRICS.incr("digest_fetch_errors_total", endpoint=endpoint, league=league)
+            METRICS.event("fetch_error", endpoint=endpoint, league=league, key=key, error=repr(exc)[:200])
+            self._remember_failure(key, exc)
+            return None
+
+        _cache_set(self.cache, key, data, policy["ttl"] + policy["grace"], meta)
+        self.cache.delete(f"neg:{key}")
+        return data or {}
+
+    def _record_results(self, data, league=None):
+        if self.history is None:
+            return
+        try:
+            with METRICS.span("history_write", trace=False):
+                stored = self.history.record(events_from_payload(data))
+            METRICS.incr("digest_history_results_stored_total", stored, league=league)
+        except Exception as exc:
+            # The history is optional: a failed write never fails the fetch.
+            METRICS.incr("digest_history_errors_total", league=league)
+            METRICS.event("history_error", league=league, error=repr(exc)[:200])
+
+    def _remember_failure(self, key, exc):
+        prev = self.cache.get(f"neg:{key}")
+        failures = (prev["data"].get("failures", 0) if prev else 0) + 1
+        retry_after = NEGATIVE_TTL_SECONDS[min(failures, len(NEGATIVE_TTL_SECONDS)) - 1]
+        _cache_set(self.cache, f"neg:{key}",
+                   {"failures": failures, "retry_after": retry_after, "error": str(exc)[:200]},
+                   retry_after)
+
+    def close(self) -> None:
+        # Let background revalidations finish so the next run starts warm.
+        self._refresh_pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- Formatting helpers ---
+
+def _format_time_local(start, tz_name: str) -> str:
+    if start is None:
         return ""
     try:
-        if len(t) == 5:
-            t += ":00"
-        dt_utc = datetime.strptime(f"{date_str} {t}", "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-        local = dt_utc.astimezone(ZoneInfo(tz_name))
-        return local.strftime("%-I:%M%p").upper()
+        return start.astimezone(ZoneInfo(tz_name)).strftime("%-I:%M%p").upper()
     except Exception:
         return ""
 
-def _format_event_line(event, tz_name: str) -> str:
-    """Format a single event into a display line using team abbreviations."""
-    home = event.get("strHomeTeam", "?")
-    away = event.get("strAwayTeam", "?")
-    event_name = event.get("strEvent", "")
-    date_str = event.get("dateEvent") or ""
-    time_str = event.get("strTime") or ""
-
+def _format_form(event: Event, history: ResultsHistory) -> str:
+    """' · NYK 7-3 W3, BOS 4-6 L1': each side's season record and streak going into the game."""
+    if history is None or not (event.home_id and event.away_id):
+        return ""
+    parts = []
+    for team, team_id in ((event.away, event.away_id), (event.home, event.home_id)):
+        try:
+            form = history.team_form(team_id, before=event.date, season=event.season)
+        except Exception:
+            return ""
+        if form.games:
+            parts.append(f"{_abbrev(team)} {form}")
+    return f" · {', '.join(parts)}" if parts else ""
+
+def _format_event_line(event: Event, tz_name: str, history: ResultsHistory = None) -> str:
+    """
+    Format a single event into a display line using team abbreviations.
+    With a ResultsHistory, team games also show both teams' record and streak.
+    """
     # For non-team sports (F1, UFC, etc.) — use event name directly
-    if home == away or not away or home == "?":
-        time_local = _format_time_local(date_str, time_str, tz_name)
-        if _has_final_score(event):
-            return f"  {event_name} (Final)"
+    if not event.is_team_game:
+        time_local = _format_time_local(event.start, tz_name)
+        if event.has_final_score:
+            return f"  {event.name} (Final)"
         elif time_local:
-            return f"  {event_name} ({time_local})"
-        return f"  {event_name}"
+            return f"  {event.name} ({time_local})"
+        return f"  {event.name}"
 
-    h = _abbrev(home)
-    a = _abbrev(away)
+    h = _abbrev(event.home)
+    a = _abbrev(event.away)
+    form = _format_form(event, history)
 
     # Team vs team
-    if _has_final_score(event):
-        hs = _safe_int(event.get("intHomeScore"))
-        a_s = _safe_int(event.get("intAwayScore"))
-        return f"  {a} {a_s} @ {h} {hs} ✓"
+    if event.has_final_score:
+        return f"  {a} {event.away_score} @ {h} {event.home_score} ✓{form}"
 
-    time_local = _format_time_local(date_str, time_str, tz_name)
+    time_local = _format_time_local(event.start, tz_name)
     if time_local:
-        return f"  {a} @ {h} ({time_local})"
-    return f"  {a} @ {h}"
+        return f"  {a} @ {h} ({time_local}){form}"
+    return f"  {a} @ {h}{form}"
 
 # --- League event fetching ---
 
-def _get_league_events_today(session, base_url, cache, league_id, league_api_name, today_local):
+def _get_league_events(fetcher: Fetcher, league_id, league_api_name, days,
+                       use_fallbacks: bool = True):
     """
-    Fetch today's events for a league.
+    Fetch a league's events falling on any of `days`.
     eventsday.php (by league name) is the most complete source on the free API tier.
-    past/next endpoints are used as fallbacks to catch API lag edge cases.
+    past/next endpoints are used as fallbacks to catch API lag edge cases; they
+    are skipped when use_fallbacks is False (leagues nobody follows).
     """
-    today_str = today_local.strftime("%Y-%m-%d")
-    today_events = []
+    days = set(days)
+    found = []
     seen_ids = set()
 
-    def _add_events(events_list):
-        for e in (events_list or []):
-            if _parse_event_date(e.get("dateEvent") or "") == today_local:
-                eid = e.get("idEvent")
-                if eid not in seen_ids:
-                    seen_ids.add(eid)
-                    today_events.append(e)
+    def _add_events(payload):
+        for e in events_from_payload(payload):
+            if e.date in days and e.id not in seen_ids:
+                seen_ids.add(e.id)
+                found.append(e)
 
     # Primary: eventsday returns all events for a specific date by league name
-    day_key = f"eventsday:{league_id}:{today_str}"
-    day_data = _cache_get(cache, day_key, EVENTS_TTL_SECONDS)
-    if day_data is None:
-        try:
-            day_data = _request_json(session, f"{base_url}/eventsday.php", {"d": today_str, "l": league_api_name})
-            _cache_set(cache, day_key, day_data)
-        except (RateLimited, Exception):
-            day_data = {}
-    _add_events(day_data.get("events"))
+    for day in sorted(days):
+        day_str = day.strftime("%Y-%m-%d")
+        day_data = fetcher.get("eventsday.php", f"eventsday:{league_id}:{day_str}",
+                               {"d": day_str, "l": league_api_name}, league=league_api_name)
+        _add_events(day_data)
+
+    if not use_fallbacks:
+        return found
 
     # Fallback: past events (catches finished games the day endpoint may miss)
-    past_key = f"pastleague:{league_id}"
-    past_data = _cache_get(cache, past_key, EVENTS_TTL_SECONDS)
-    if past_data is None:
-        try:
-            past_data = _request_json(session, f"{base_url}/eventspastleague.php", {"id": league_id})
-            _cache_set(cache, past_key, past_data)
-        except (RateLimited, Exception):
-            past_data = {}
-    _add_events(past_data.get("events"))
+    past_data = fetcher.get("eventspastleague.php", f"pastleague:{league_id}", {"id": league_id},
+                            league=league_api_name)
+    _add_events(past_data)
 
     # Fallback: next events (catches upcoming games not yet on eventsday)
-    next_key = f"nextleague:{league_id}"
-    next_data = _cache_get(cache, next_key, EVENTS_TTL_SECONDS)
-    if next_data is None:
-        try:
-            next_data = _request_json(session, f"{base_url}/eventsnextleague.php", {"id": league_id})
-            _cache_set(cache, next_key, next_data)
-        except (RateLimited, Exception):
-            next_data = {}
-    _add_events(next_data.get("events"))
+    next_data = fetcher.get("eventsnextleague.php", f"nextleague:{league_id}", {"id": league_id},
+                            league=league_api_name)
+    _add_events(next_data)
+
+    return found
+
+def _rank_events(events, league_api_name, team_index=None, top_n: int = None):
+    """Followed-team games first (stable otherwise), capped at top_n per league."""
+    if team_index is not None and team_index.follows_league(league_api_name):
+        events = sorted(events, key=lambda e: -team_index.event_priority(league_api_name, e))
+    if top_n:
+        events = events[:top_n]
+    return events
+
+
+def _get_league_season_events(fetcher: Fetcher, league_id, league_api_name, days, season, today):
+    """
+    Fetch a league's events on any of `days` from its bulk season schedule.
+    One eventsseason.php payload is indexed by date; eventsday.php is only
+    called for days the payload doesn't span (no known season, or a
+    truncated free-tier payload) and for days whose results may still change.
+    """
+    index = ScheduleIndex()
+    fetched_at = 0
+    if season:
+        key = f"season:{league_id}:{season}"
+        index.add(events_from_payload(fetcher.get("eventsseason.php", key, {"id": league_id, "s": season},
+                                                  league=league_api_name)))
+        entry = fetcher.cache.get(key)
+        fetched_at = entry.get("ts", 0) if entry else 0
+
+    day_ttl = _endpoint_policy("eventsday.php", fetcher.policies)["ttl"]
+    settle_from = today - timedelta(days=RESULT_SETTLE_DAYS)
+
+    def _may_change(day):
+        if day > today:
+            return False
+        if day >= settle_from:
+            return time.time() - fetched_at >= day_ttl
+        # Older days only change if a game still has no result
+        return any(e.is_team_game and not e.has_final_score for e in index.events_on(day))
+
+    for day in sorted(days):
+        if index.covers(day) and not _may_change(day):
+            continue
+        day_str = day.strftime("%Y-%m-%d")
+        index.add(events_from_payload(fetcher.get("eventsday.php", f"eventsday:{league_id}:{day_str}",
+                                                  {"d": day_str, "l": league_api_name},
+                                                  league=league_api_name)))
 
-    return today_events
+    return [e for day in sorted(days) for e in index.events_on(day)]
+
+def _league_activity(fetcher: Fetcher, activity: LeagueActivity, league_id, league_api_name,
+                     days, today, followed: bool = True) -> dict:
+    entry = activity.lookup(league_id)
+    if activity.needs_refresh(entry, days, followed):
+        entry = activity.refresh(fetcher, league_id, league_api_name, today) or entry
+    return entry
 
 
 # --- Main entry point ---
 
-def build_todays_games(tz_name: str, api_key: str) -> str:
+def fetch_snapshot(days, api_key: str, rate_per_second: float = None, burst: int = None,
+                   max_workers: int = None, fallback_leagues=None, leagues=None,
+                   policies: dict = None, skip_dormant: bool = True, season_bulk: bool = False,
+                   today=None, record_history: bool = True) -> dict:
     """
-    Build the sports digest showing only today's active games/events.
-    Leagues with no games today are omitted entirely.
+    Fetch every league once for the given local dates.
+    Returns {league display name: [Event, ...]}; render_digest() turns it into
+    a digest for any subscriber without further API calls.
+    fallback_leagues is a set of API league names that need the past/next
+    fallbacks (None means all of them). leagues restricts the fetch to some
+    LEAGUES display names; policies overrides ENDPOINT_POLICIES.
+    With skip_dormant, leagues the activity index marks as out of season
+    are skipped without any requests. season_bulk reads each league's
+    season schedule in one request instead of one eventsday.php call per
+    day (for date ranges); today (default: the earliest of days) decides
+    which days may still change. With record_history, final scores in
+    every new payload are written to the results history.
     """
+    today = today or min(days)
     base_url = _base_url(api_key)
-    cache = _load_cache()
-    today_local = datetime.now(ZoneInfo(tz_name)).date()
+    leagues = [name for name in LEAGUES if leagues is None or name in leagues]
+    limiter = TokenBucket(rate_per_second or RATE_LIMIT_PER_SECOND, burst or RATE_LIMIT_BURST)
+    workers = max(1, min(max_workers or MAX_FETCH_WORKERS, len(leagues) or 1))
+
+    def _fetch(league):
+        league_id, league_api_name = LEAGUES[league]
+        use_fallbacks = fallback_leagues is None or league_api_name in fallback_leagues
+        with METRICS.span("league_fetch", league=league_api_name) as span:
+            try:
+                entry = None
+                if skip_dormant or season_bulk:
+                    # Season bulk fetches need the season; otherwise only leagues
+                    # with fallbacks have the past/next payloads the index reads.
+                    entry = _league_activity(fetcher, activity, league_id, league_api_name, days, today,
+                                             followed=season_bulk or use_fallbacks)
+                if skip_dormant and activity.is_dormant(entry, days):
+                    METRICS.incr("digest_leagues_skipped_total", league=league_api_name)
+                    span.fields["skipped"] = "dormant"
+                    return []
+                if season_bulk:
+                    events = _get_league_season_events(fetcher, league_id, league_api_name, days,
+                                                       (entry or {}).get("season"), today)
+                else:
+                    events = _get_league_events(fetcher, league_id, league_api_name, days, use_fallbacks)
+                if skip_dormant or season_bulk:
+                    activity.observe(league_id, entry, events, today)
+            except Exception as exc:
+                METRICS.incr("digest_league_errors_total", league=league_api_name)
+                span.fields["error"] = repr(exc)[:200]
+                return []
+            span.fields["events"] = len(events)
+            METRICS.gauge("digest_league_events", len(events), league=league_api_name)
+            return events
 
+    cache = _load_cache()
+    activity = LeagueActivity(cache)
+    history = open_history() if record_history else None
+    try:
+        with _make_session(workers + REFRESH_WORKERS) as session, \
+                Fetcher(session, base_url, cache, limiter, policies=policies, history=history) as fetcher, \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() keeps LEAGUES order even though leagues finish out of order
+            return dict(zip(leagues, pool.map(_fetch, leagues)))
+    finally:
+        with METRICS.span("cache_save", backend=CACHE_BACKEND):
+            cache.close()
+        if history is not None:
+            history.close()
+
+def _render_day_sections(snapshot: dict, day, tz_name: str, team_index=None, top_n: int = None,
+                         history: ResultsHistory = None) -> list:
+    """One "**League**" section per league with games on day."""
     sections = []
 
-    with requests.Session() as session:
-        for league_name, (league_id, league_api_name) in LEAGUES.items():
-            try:
-                events = _get_league_events_today(session, base_url, cache, league_id, league_api_name, today_local)
-            except Exception:
-                continue
+    for league_name, events in snapshot.items():
+        league_api_name = LEAGUES[league_name][1]
+        events = [e for e in events if e.date == day]
+        events = _rank_events(events, league_api_name, team_index, top_n)
+        if not events:
+            continue
 
-            if not events:
-                continue
+        lines = [f"**{league_name}**"]
+        for e in events:
+            lines.append(_format_event_line(e, tz_name, history))
 
-            lines = [f"**{league_name}**"]
-            for e in events:
-                lines.append(_format_event_line(e, tz_name))
+        sections.append("\n".join(lines))
 
-            sections.append("\n".join(lines))
+    return sections
+
+def render_digest(snapshot: dict, tz_name: str, team_index=None, top_n: int = None,
+                  today_local=None, history: ResultsHistory = None) -> str:
+    """
+    Render today's games from a fetch_snapshot() result.
+    Leagues with no games today are omitted entirely.
+    With a TeamIndex, followed teams' games are listed first; top_n caps games per league.
+    With a ResultsHistory, team games show each side's record and streak.
+    """
+    today_local = today_local or datetime.now(ZoneInfo(tz_name)).date()
+    sections = _render_day_sections(snapshot, today_local, tz_name, team_index, top_n, history)
 
     if not sections:
         return "No games or events today."
 
     return "\n\n".join(sections)
+
+def render_range_digest(snapshot: dict, days, tz_name: str, team_index=None, top_n: int = None,
+                        history: ResultsHistory = None) -> str:
+    """
+    Render a multi-day digest (weekly preview, weekend recap) from a
+    fetch_snapshot() result: a header per day with games, then that day's
+    leagues as in render_digest(). top_n caps games per league per day.
+    """
+    blocks = []
+    for day in sorted(days):
+        sections = _render_day_sections(snapshot, day, tz_name, team_index, top_n, history)
+        if sections:
+            blocks.append(f"📅 __{day.strftime('%a %b %d')}__\n\n" + "\n\n".join(sections))
+
+    if not blocks:
+        return "No games or events in this period."
+
+    return "\n\n".join(blocks)
+
+def date_range(start, end) -> list:
+    """Every date from start to end inclusive."""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+def build_todays_games(tz_name: str, api_key: str, rate_per_second: float = None,
+                       burst: int = None, max_workers: int = None,
+                       team_index=None, top_n: int = None, today_local=None) -> str:
+    """
+    Build the sports digest showing only today's active games/events.
+    Leagues are fetched concurrently; all workers share one rate limiter.
+    With a TeamIndex, leagues with no followed teams only hit eventsday.php.
+    today_local pins "today" (e.g. to replay a recording from another day).
+    """
+    today_local = today_local or datetime.now(ZoneInfo(tz_name)).date()
+    fallback_leagues = None
+    if team_index is not None:
+        fallback_leagues = {api for _, api in LEAGUES.values() if team_index.follows_league(api)}
+    snapshot = fetch_snapshot([today_local], api_key, rate_per_second, burst, max_workers,
+                              fallback_leagues)
+    return render_digest(snapshot, tz_name, team_index, top_n, today_local)
+
+def build_range_digest(tz_name: str, api_key: str, start, end, rate_per_second: float = None,
+                       burst: int = None, max_workers: int = None,
+                       team_index=None, top_n: int = None) -> str:
+    """
+    Build a digest covering start..end (local dates, inclusive), e.g. a
+    weekly preview or a weekend recap. Each league's season schedule is
+    fetched in bulk, so a 7-day preview costs about one request per league.
+    """
+    days = date_range(start, end)
+    snapshot = fetch_snapshot(days, api_key, rate_per_second, burst, max_workers,
+                              fallback_leagues=set(), season_bulk=True,
+                              today=datetime.now(ZoneInfo(tz_name)).date())
+    return render_range_digest(snapshot, days, tz_name, team_index, top_n)
+
+def _season_name(season: str, current_season: str = None) -> str:
+    """Match a requested season ("2024" or "2024-2025") to a league's naming ("2025" vs "2025-2026")."""
+    start = season.split("-", 1)[0]
+    if current_season and "-" in current_season and start.isdigit():
+        return f"{start}-{int(start) + 1}"
+    if current_season and "-" not in current_season:
+        return start
+    return season
+
+def backfill_history(api_key: str, seasons, leagues=None, rate_per_second: float = None,
+                     burst: int = None, max_workers: int = None) -> dict:
+    """
+    Bulk-import past seasons into the results history: one eventsseason.php
+    request per league and season (served from cache when already fetched).
+    leagues restricts it to some API league names. Season names follow each
+    league's own scheme, taken from the activity index.
+    Returns {league display name: results stored or changed}.
+    """
+    base_url = _base_url(api_key)
+    leagues = [name for name, (_, api_name) in LEAGUES.items() if leagues is None or api_name in leagues]
+    limiter = TokenBucket(rate_per_second or RATE_LIMIT_PER_SECOND, burst or RATE_LIMIT_BURST)
+    workers = max(1, min(max_workers or MAX_FETCH_WORKERS, len(leagues) or 1))
+    today = datetime.now().date()
+
+    def _backfill(league):
+        league_id, league_api_name = LEAGUES[league]
+        stored = 0
+        with METRICS.span("history_backfill", league=league_api_name):
+            entry = _league_activity(fetcher, activity, league_id, league_api_name, [today], today) or {}
+            for season in dict.fromkeys(_season_name(s, entry.get("season")) for s in seasons):
+                payload = fetcher.get("eventsseason.php", f"season:{league_id}:{season}",
+                                      {"id": league_id, "s": season}, league=league_api_name)
+                stored += history.record(events_from_payload(payload))
+        return stored
+
+    history = open_history()
+    if history is None:
+        raise RuntimeError(f"Can't open the results history at {HISTORY_DB_FILE}")
+    cache = _load_cache()
+    activity = LeagueActivity(cache)
+    try:
+        # The fetcher doesn't write through: payloads already in the cache must be recorded too.
+        with _make_session(workers + REFRESH_WORKERS) as session, \
+                Fetcher(session, base_url, cache, limiter) as fetcher, \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(leagues, pool.map(_backfill, leagues)))
+    finally:
+        cache.close()
+        history.close()
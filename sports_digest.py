@@ -1,29 +1,148 @@
+import argparse
 import json
-from datetime import datetime
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from zoneinfo import ZoneInfo
 
-from notify_discord import send_discord_webhook
-from sports import build_todays_games
+from metrics import METRICS
+from notify_discord import DiscordDelivery, send_discord_webhook
+from sports import date_range, fetch_snapshot, render_digest, render_range_digest
+from subscribers import (digest_history, digest_title, fetch_options, followed_leagues, load_subscribers,
+                         local_today)
+
+MAX_RANGE_DAYS = 31
+
+def _post_digest(snapshot: dict, sub: dict, delivery: DiscordDelivery, days=None, history=None) -> dict:
+    tz_name = sub["timezone"]
+    with METRICS.span("render", subscriber=sub["name"]):
+        if days:
+            todays_games = render_range_digest(snapshot, days, tz_name, sub["team_index"],
+                                               sub["top_games_count"], history)
+        else:
+            todays_games = render_digest(snapshot, tz_name, sub["team_index"], sub["top_games_count"],
+                                         history=history)
+
+    with METRICS.span("deliver", subscriber=sub["name"]) as span:
+        result = send_discord_webhook(sub["webhook_url"], todays_games,
+                                      title=digest_title(tz_name, days), delivery=delivery)
+        span.fields.update(messages=len(result["message_ids"]), queued=result["queued"])
+    return result
+
+def _configure_metrics(settings: dict, base_dir: Path) -> None:
+    """settings.trace_file / settings.prometheus_textfile; relative paths are under the project dir."""
+    def _path(name):
+        value = settings.get(name)
+        return str(base_dir / value) if value else None
+
+    METRICS.configure(trace_path=_path("trace_file"), prometheus_path=_path("prometheus_textfile"))
+
+def _run_once(subscribers: list, api_key: str, settings: dict, days=None) -> int:
+    """
+    Fetch once, post every subscriber's digest. Returns the number of failed subscribers.
+    With days (a list of dates) every subscriber gets a digest covering that
+    range, built from bulk season schedules.
+    """
+    todays = {local_today(sub) for sub in subscribers}
+    if days:
+        # Range digests don't need the past/next fallbacks: the season schedule covers them.
+        fetch_days, fallback_leagues = days, set()
+    else:
+        # One fetch for everyone: every subscriber's local "today", and the
+        # past/next fallbacks for any league at least one subscriber follows.
+        fetch_days, fallback_leagues = todays, followed_leagues(subscribers)
+
+    with METRICS.span("fetch", days=len(fetch_days)):
+        snapshot = fetch_snapshot(
+            fetch_days,
+            api_key,
+            fallback_leagues=fallback_leagues,
+            season_bulk=bool(days),
+            today=min(todays),
+            **fetch_options(settings),
+        )
+
+    failed = 0
+    history = digest_history(settings)
+    with DiscordDelivery() as delivery, (history or nullcontext()), \
+            ThreadPoolExecutor(max_workers=len(subscribers)) as pool:
+        replayed = delivery.flush_outbox()
+        if replayed:
+            print(f"📬 Delivered {replayed} queued message(s) from an earlier run")
+
+        futures = {pool.submit(_post_digest, snapshot, sub, delivery, days, history): sub["name"]
+                   for sub in subscribers}
+        for future, name in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ Failed to post digest for {name}: {e}")
+                continue
+            if result["queued"]:
+                failed += 1
+                print(f"⚠️ {result['queued']} message(s) for {name} queued for the next run")
+            else:
+                print(f"✅ Posted sports digest to Discord! ({name})")
+
+    return failed
+
+def _range_days(args, parser, tz_name: str):
+    """Dates for --week/--from/--to, or None for the usual "today" digest."""
+    if not (args.week or args.start or args.end):
+        return None
+    today = datetime.now(ZoneInfo(tz_name)).date()
+    start = args.start or today
+    end = args.end or start + timedelta(days=6)
+    if end < start:
+        parser.error("--to is before --from")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        parser.error(f"date ranges are limited to {MAX_RANGE_DAYS} days")
+    return date_range(start, end)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post today's sports digest to Discord.")
+    parser.add_argument("--live", action="store_true",
+                        help="stay running and edit the posted digest in place while games are on")
+    parser.add_argument("--week", action="store_true", help="post a preview of the next 7 days")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help="first day of a date-range digest (default: today)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help="last day of a date-range digest (default: 6 days after --from)")
+    args = parser.parse_args(argv)
+    if args.live and (args.week or args.start or args.end):
+        parser.error("--live only works on today's digest")
 
-def main():
     base_dir = Path(__file__).resolve().parent
     config_path = base_dir / "config.json"
 
     with open(config_path, "r") as f:
         config = json.load(f)
 
-    webhook_url = config["discord"]["webhook_url"]
     settings = config.get("settings", {})
-    tz_name = settings.get("timezone", "America/New_York")
     api_key = settings.get("sportsdb_api_key", "123")
+    subscribers = load_subscribers(config)
+    _configure_metrics(settings, base_dir)
+    days = _range_days(args, parser, subscribers[0]["timezone"])
 
-    todays_games = build_todays_games(tz_name=tz_name, api_key=api_key)
+    if args.live:
+        from live_digest import run_live
+        try:
+            run_live(subscribers, api_key, settings)
+        finally:
+            METRICS.flush()
+        return
 
-    stamp = datetime.now().strftime("%a %b %d")
-    body = f"🏟️ Sports Digest - {stamp}\n━━━━━━━━━━━━━━━━━━━━\n\n{todays_games}"
+    try:
+        with METRICS.span("run", subscribers=len(subscribers)):
+            failed = _run_once(subscribers, api_key, settings, days)
+    finally:
+        METRICS.flush()
 
-    send_discord_webhook(webhook_url, body)
-    print("✅ Posted sports digest to Discord!")
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
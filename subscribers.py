@@ -0,0 +1,61 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sports import LEAGUES, open_history
+from team_index import TeamIndex
+
+
+def load_subscribers(config: dict) -> list:
+    """
+    Subscribers from config.json. Each entry in "subscribers" may set
+    name, webhook_url, timezone, teams and top_games_count; anything missing
+    falls back to the top-level discord/settings/teams values. Without a
+    "subscribers" list the top-level config is the single subscriber.
+    """
+    settings = config.get("settings", {})
+    defaults = {
+        "name": "default",
+        "webhook_url": config.get("discord", {}).get("webhook_url"),
+        "timezone": settings.get("timezone", "America/New_York"),
+        "teams": config.get("teams", {}),
+        "top_games_count": settings.get("top_games_count"),
+    }
+    subscribers = []
+    for i, entry in enumerate(config.get("subscribers") or [defaults]):
+        sub = {**defaults, "name": f"subscriber-{i + 1}", **entry}
+        sub["team_index"] = TeamIndex.from_config(sub["teams"])
+        subscribers.append(sub)
+    return subscribers
+
+def local_today(sub: dict):
+    """Today's date in the subscriber's timezone."""
+    return datetime.now(ZoneInfo(sub["timezone"])).date()
+
+def followed_leagues(subscribers: list) -> set:
+    """API names of the leagues at least one subscriber follows (these get the past/next fallbacks)."""
+    return {
+        api_name for _, api_name in LEAGUES.values()
+        if any(sub["team_index"].follows_league(api_name) for sub in subscribers)
+    }
+
+def fetch_options(settings: dict) -> dict:
+    """fetch_snapshot() rate/worker keyword arguments from config.json settings."""
+    return {
+        "rate_per_second": settings.get("requests_per_second"),
+        "burst": settings.get("request_burst"),
+        "max_workers": settings.get("max_workers"),
+    }
+
+def digest_title(tz_name: str, days=None, today_local=None) -> str:
+    """
+    Message title: the first and last of days for a range digest, otherwise
+    today_local (default: today in tz_name).
+    """
+    if days:
+        return f"🏟️ Sports Digest - {min(days).strftime('%a %b %d')} – {max(days).strftime('%a %b %d')}"
+    stamp = (today_local or datetime.now(ZoneInfo(tz_name)).date()).strftime("%a %b %d")
+    return f"🏟️ Sports Digest - {stamp}"
+
+def digest_history(settings: dict):
+    """The results history for records/streaks in the digest, unless settings.show_records is false."""
+    return open_history() if settings.get("show_records", True) else None
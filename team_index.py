@@ -0,0 +1,107 @@
+from sports import LEAGUES, TEAM_ABBREVS_BY_LEAGUE
+
+
+def _normalize(name: str) -> str:
+    return " ".join((name or "").lower().split())
+
+def _suffixes(name: str):
+    """'New York Knicks' -> 'new york knicks', 'york knicks', 'knicks'."""
+    words = _normalize(name).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+def _league_aliases() -> dict:
+    """
+    Config group names ("NBA", "Premier League", ...) -> LEAGUES API league name.
+    Accepts the API name itself or the display name without its emoji.
+    """
+    aliases = {}
+    for display_name, (_, api_name) in LEAGUES.items():
+        aliases[_normalize(api_name)] = api_name
+        aliases[_normalize(display_name.split(" ", 1)[-1])] = api_name
+    return aliases
+
+
+class TeamIndex:
+    """
+    Precompiled lookup of followed teams, scoped per league.
+
+    Every full name, nickname (any trailing-word suffix, e.g. "Knicks",
+    "Red Sox") and abbreviation in TEAM_ABBREVS_BY_LEAGUE maps to a canonical
+    team id (the league's abbreviation code), so matching an event's team is a
+    dict lookup instead of a scan over the config lists. Nicknames shared by
+    several teams in a league ("Sox", "City") are not aliases; following one
+    is a config error.
+    """
+
+    def __init__(self, canonical: dict, followed: dict):
+        # canonical: {league_api_name: {alias: team_id}}
+        # followed:  {league_api_name: {team_id, ...}}
+        self._canonical = canonical
+        self._followed = followed
+
+    @classmethod
+    def from_config(cls, teams_config: dict) -> "TeamIndex":
+        """
+        Build from config.json's "teams" section. Groups that don't name a
+        league in LEAGUES (e.g. "College") are ignored. Raises ValueError for
+        a name that could be more than one team in its league.
+        """
+        canonical, ambiguous = {}, {}
+        for league, teams in TEAM_ABBREVS_BY_LEAGUE.items():
+            candidates = {}
+            for full_name, abbrev in teams.items():
+                for alias in _suffixes(full_name):
+                    candidates.setdefault(alias, {})[abbrev] = full_name
+            aliases = canonical.setdefault(league, {})
+            for alias, teams_by_abbrev in candidates.items():
+                if len(teams_by_abbrev) == 1:
+                    aliases[alias] = next(iter(teams_by_abbrev))
+                else:
+                    ambiguous.setdefault(league, {})[alias] = sorted(teams_by_abbrev.values())
+            # Full names and abbreviations always win over another team's nickname.
+            for full_name, abbrev in teams.items():
+                aliases[_normalize(full_name)] = abbrev
+                aliases[_normalize(abbrev)] = abbrev
+
+        league_aliases = _league_aliases()
+        followed = {}
+        for group, names in (teams_config or {}).items():
+            league = league_aliases.get(_normalize(group))
+            if league is None:
+                continue
+            aliases = canonical.get(league, {})
+            ids = followed.setdefault(league, set())
+            for name in names or []:
+                key = _normalize(name)
+                if key not in aliases and key in ambiguous.get(league, {}):
+                    options = ", ".join(ambiguous[league][key])
+                    raise ValueError(f'"{name}" in teams.{group} could be any of {options}; '
+                                     "use the full team name")
+                ids.add(aliases.get(key, key))
+        return cls(canonical, {k: v for k, v in followed.items() if v})
+
+    def team_id(self, league: str, team_name: str) -> str:
+        key = _normalize(team_name)
+        aliases = self._canonical.get(league)
+        if aliases:
+            return aliases.get(key, key)
+        return key
+
+    def follows_league(self, league: str) -> bool:
+        return league in self._followed
+
+    def is_followed(self, league: str, team_name: str) -> bool:
+        followed = self._followed.get(league)
+        if not followed or not team_name:
+            return False
+        if self.team_id(league, team_name) in followed:
+            return True
+        # Teams outside TEAM_ABBREVS_BY_LEAGUE: let a configured nickname
+        # match the tail of the full name ("Rutgers" in "Rutgers Scarlet Knights").
+        return any(s in followed for s in _suffixes(team_name))
+
+    def event_priority(self, league: str, event) -> int:
+        """Number of followed teams playing in the event (0, 1 or 2)."""
+        if league not in self._followed:
+            return 0
+        return int(self.is_followed(league, event.home)) + int(self.is_followed(league, event.away))
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# The project is a flat set of scripts, not a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sports  # noqa: E402
+from cache_store import JsonCacheStore  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from replay import StandInServer  # noqa: E402
+
+
+@pytest.fixture
+def isolated_files(tmp_path, monkeypatch):
+    """Point the API cache and results history at tmp_path."""
+    monkeypatch.setattr(sports, "CACHE_FILE", str(tmp_path / "cache.json"))
+    monkeypatch.setattr(sports, "CACHE_DB_FILE", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(sports, "HISTORY_DB_FILE", str(tmp_path / "history.db"))
+    return tmp_path
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """A StandInServer with no fixtures yet; TheSportsDB requests are pointed at it."""
+    with StandInServer({}) as server:
+        monkeypatch.setenv("SPORTSDB_BASE_URL", server.base_url)
+        yield server
+
+
+@pytest.fixture
+def fetcher(tmp_path, stand_in):
+    """A Fetcher on a JSON cache under tmp_path, pointed at the stand-in server."""
+    cache = JsonCacheStore(str(tmp_path / "cache.json"))
+    with sports._make_session(4) as session, \
+            sports.Fetcher(session, sports._base_url("test"), cache, sports.TokenBucket(1000, 1000)) as f:
+        yield f
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    """METRICS switched on (Prometheus output under tmp_path) for one test, and off again after."""
+    METRICS.__init__()
+    METRICS.configure(prometheus_path=str(tmp_path / "digest.prom"))
+    yield METRICS
+    METRICS.__init__()
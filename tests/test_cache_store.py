@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+import pytest
+
+from cache_store import CacheStore, SqliteCacheStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SqliteCacheStore(str(tmp_path / "cache.db")) as s:
+        yield s
+
+
+def _write_legacy(path, events):
+    with open(path, "w") as f:
+        json.dump({"events": events}, f)
+
+
+def test_cache_store_is_abstract():
+    with pytest.raises(TypeError):
+        CacheStore()
+
+
+def test_json_cache_is_migrated_once(tmp_path, store):
+    legacy = str(tmp_path / ".sportsdb_cache.json")
+    now = int(time.time())
+    _write_legacy(legacy, {
+        "eventsday:1:2025-01-10": {"data": {"events": [{"idEvent": "1"}]}, "ts": now},
+        "newer": {"data": {"events": []}, "ts": now},
+        "broken": "not an entry",
+    })
+    store.set("newer", {"events": [{"idEvent": "2"}]})
+
+    assert store.migrate_from_json(legacy) == 2
+    assert not os.path.exists(legacy)
+    assert os.path.exists(legacy + ".migrated")
+    assert store.get("eventsday:1:2025-01-10")["data"] == {"events": [{"idEvent": "1"}]}
+    assert store.get("newer")["data"] == {"events": [{"idEvent": "2"}]}  # never overwritten
+    assert store.get("broken") is None
+
+    # A second run finds no file; a restored one is ignored thanks to the store_meta flag.
+    assert store.migrate_from_json(legacy) == 0
+    _write_legacy(legacy, {"late": {"data": {}, "ts": now}})
+    assert store.migrate_from_json(legacy) == 0
+    assert store.get("late") is None
+
+
+def test_evict_drops_entries_expired_past_retention(store):
+    store.set("old", {"x": 1}, ttl_seconds=60)
+    store.set("fresh", {"x": 2}, ttl_seconds=60)
+    now = int(time.time())
+
+    assert store.evict(now + store.stale_retention_seconds) == 0  # stale, but still kept
+    store._conn.execute("UPDATE entries SET expires = ? WHERE key = 'old'",
+                        (now - store.stale_retention_seconds - 1,))
+    assert store.evict(now) == 1
+    assert store.get("old") is None and store.get("fresh") is not None
+
+
+def test_evict_keeps_the_newest_entries_under_the_size_cap(store):
+    payload = {"x": "y" * 100}
+    size = len(json.dumps(payload, separators=(",", ":")))
+    for i in range(5):
+        store.set(f"k{i}", payload)
+        store._conn.execute("UPDATE entries SET ts = ts - ? WHERE key = ?", (100 - i, f"k{i}"))
+    store.max_bytes = 3 * size
+
+    assert store.evict() == 2
+    assert [k for k in ("k0", "k1", "k2", "k3", "k4") if store.get(k)] == ["k2", "k3", "k4"]
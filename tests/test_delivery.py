@@ -0,0 +1,69 @@
+import time
+
+import notify_discord
+from notify_discord import (EMBED_CHARS_PER_MESSAGE, EMBED_DESCRIPTION_MAX, EMBEDS_PER_MESSAGE,
+                            DiscordDelivery, Outbox, _pack_embeds)
+
+
+def _message_chars(message):
+    return sum(len(e["description"]) + len(e.get("title", "")) for e in message["embeds"])
+
+
+def test_pack_embeds_respects_discord_limits():
+    lines = [f"**League {i}**\n  AAA {i} @ BBB {i} (7:30PM)" for i in range(400)]
+    body = "\n\n".join(lines) + "\n" + "x" * (EMBED_DESCRIPTION_MAX + 500)
+    messages = _pack_embeds(body, title="Digest")
+
+    assert len(messages) > 1
+    for message in messages:
+        assert 1 <= len(message["embeds"]) <= EMBEDS_PER_MESSAGE
+        assert _message_chars(message) <= EMBED_CHARS_PER_MESSAGE
+        assert all(len(e["description"]) <= EMBED_DESCRIPTION_MAX for e in message["embeds"])
+    assert messages[0]["embeds"][0]["title"] == "Digest"
+    assert sum("title" in e for m in messages for e in m["embeds"]) == 1
+
+    text = "\n".join(e["description"] for m in messages for e in m["embeds"])
+    assert "  AAA 399 @ BBB 399 (7:30PM)" in text  # indentation survives packing
+    assert text.count("x") >= EMBED_DESCRIPTION_MAX + 500
+
+
+def test_short_digest_is_one_embed():
+    messages = _pack_embeds("**NBA**\n  NYK @ BOS", title="Digest")
+    assert messages == [{"embeds": [{"description": "**NBA**\n  NYK @ BOS",
+                                     "color": notify_discord.EMBED_COLOR, "title": "Digest"}]}]
+
+
+def test_outbox_replays_queued_messages(tmp_path, stand_in, monkeypatch):
+    monkeypatch.setattr(notify_discord, "MAX_SEND_ATTEMPTS", 1)
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+    payloads = [{"content": "one"}, {"content": "two"}]
+
+    with DiscordDelivery(outbox) as delivery:
+        stand_in.error_rate = 1.0
+        result = delivery.send(stand_in.webhook_url, payloads)
+        assert result == {"message_ids": [], "queued": 2}
+        assert [item["payload"] for item in outbox.pending()] == payloads
+
+        # A still-failing replay keeps everything, in order
+        assert delivery.flush_outbox() == 0
+        assert [item["payload"] for item in outbox.pending()] == payloads
+
+        stand_in.error_rate = 0.0
+        stand_in.reset_stats()
+        assert delivery.flush_outbox() == 2
+        assert stand_in.stats["webhook_requests"] == 2
+        assert outbox.pending() == []
+        assert delivery.flush_outbox() == 0
+
+
+def test_outbox_drops_expired_messages(tmp_path, stand_in):
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+    outbox.append(stand_in.webhook_url, [{"content": "stale"}])
+    item = outbox.pending()[0]
+    item["ts"] = int(time.time()) - notify_discord.OUTBOX_MAX_AGE_SECONDS - 1
+    outbox.replace([item])
+
+    with DiscordDelivery(outbox) as delivery:
+        assert delivery.flush_outbox() == 0
+    assert stand_in.stats["webhook_requests"] == 0
+    assert outbox.pending() == []
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import time
+from datetime import date
+from urllib.parse import parse_qsl
+
+import sports
+from replay import FIXTURES_FILE, RECORD_DIR_ENV, _fixture_key, load_fixtures, synthetic_fixtures
+from sports import TokenBucket
+
+
+def test_token_bucket_backoff_pauses_every_caller():
+    bucket = TokenBucket(rate=1000, burst=5)
+    bucket.backoff(0.2)
+    bucket.backoff(0.05)  # a shorter pause never cuts a longer one short
+    t0 = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - t0 >= 0.19
+
+
+def test_token_bucket_backoff_empties_the_burst():
+    bucket = TokenBucket(rate=20, burst=5)
+    bucket.backoff(0.01)
+    time.sleep(0.02)
+    t0 = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    # No banked tokens after a backoff: three acquires take ~2-3 refills at 20/s
+    assert time.monotonic() - t0 >= 0.08
+
+
+def test_replay_on_the_recorded_date(isolated_files, stand_in):
+    day = date(2024, 3, 1)
+    stand_in.fixtures = synthetic_fixtures(sports.LEAGUES, 4, day)
+
+    digest = sports.build_todays_games("UTC", "test", rate_per_second=1000, burst=1000, today_local=day)
+    assert "**🏀 NBA**" in digest
+    assert digest.count(" @ ") == 4 * len(sports.LEAGUES)
+    assert stand_in.stats["api_requests"] > 0
+
+    stand_in.reset_stats()
+    assert sports.build_todays_games("UTC", "test", rate_per_second=1000, burst=1000,
+                                     today_local=day) == digest
+    assert stand_in.stats["api_requests"] == 0
+
+
+DAY = date(2024, 3, 1)
+PARAMS = {"d": DAY.isoformat(), "l": "NBA"}
+KEY = f"eventsday:4387:{DAY.isoformat()}"
+
+
+def _get(fetcher):
+    return fetcher.get("eventsday.php", KEY, PARAMS, league="NBA")
+
+
+def test_expired_entry_is_revalidated_with_a_304(fetcher, stand_in):
+    stand_in.fixtures = synthetic_fixtures(sports.LEAGUES, 2, DAY)
+    first = _get(fetcher)
+    assert stand_in.stats["api_requests"] == 1
+
+    fetcher.policies = {"eventsday.php": {"ttl": 0, "grace": 0}}  # every entry is past its grace window
+    assert _get(fetcher) == first
+    assert (stand_in.stats["api_requests"], stand_in.stats["status_304"]) == (2, 1)
+
+
+def test_stale_entry_is_served_and_refreshed_in_the_background(fetcher, stand_in):
+    stand_in.fixtures = synthetic_fixtures(sports.LEAGUES, 2, DAY)
+    old = _get(fetcher)
+    fixture_key = _fixture_key("GET", "/eventsday.php", PARAMS)
+    stand_in.fixtures[fixture_key] = {"status": 200, "body": '{"events": []}', "headers": {"ETag": '"new"'}}
+
+    fetcher.policies = {"eventsday.php": {"ttl": 0, "grace": 3600}}
+    assert _get(fetcher) == old
+    fetcher.close()  # waits for the background refresh
+    assert stand_in.stats["api_requests"] == 2
+    assert fetcher.cache.get(KEY)["data"]["events"] == []
+    assert fetcher.cache.get(KEY)["meta"]["etag"] == '"new"'
+
+
+def test_failures_back_off_before_retrying(fetcher, stand_in):
+    stand_in.rate_429 = 1.0
+    assert _get(fetcher) == {}
+    assert stand_in.stats["api_requests"] == sports.MAX_RETRIES
+
+    # Inside the backoff: no request at all
+    assert _get(fetcher) == {}
+    assert stand_in.stats["api_requests"] == sports.MAX_RETRIES
+    neg = fetcher.cache.get(f"neg:{KEY}")
+    assert neg["data"]["retry_after"] == sports.NEGATIVE_TTL_SECONDS[0]
+
+    # Once it has passed, a second failure backs off for longer
+    neg["ts"] -= sports.NEGATIVE_TTL_SECONDS[0] + 1
+    assert _get(fetcher) == {}
+    assert stand_in.stats["api_requests"] == 2 * sports.MAX_RETRIES
+    assert fetcher.cache.get(f"neg:{KEY}")["data"]["retry_after"] == sports.NEGATIVE_TTL_SECONDS[1]
+
+    # A success clears it
+    stand_in.rate_429 = 0.0
+    fetcher.cache.get(f"neg:{KEY}")["ts"] -= sports.NEGATIVE_TTL_SECONDS[1] + 1
+    assert not fetcher.failed_recently(KEY)
+    _get(fetcher)
+    assert fetcher.cache.get(f"neg:{KEY}") is None
+
+
+def test_recordings_keep_only_successful_responses(tmp_path, stand_in, monkeypatch):
+    stand_in.fixtures = synthetic_fixtures(sports.LEAGUES, 2, DAY)
+    record_dir = tmp_path / "recording"
+    monkeypatch.setenv(RECORD_DIR_ENV, str(record_dir))
+    key = next(k for k in stand_in.fixtures if k.startswith("GET eventsday.php?"))
+    params = dict(parse_qsl(key.split("?", 1)[1]))
+    url = f"{sports._base_url('test')}/eventsday.php"
+
+    # Recording with a warm cache: the revalidation comes back 304 with no body.
+    with sports._make_session(1) as session:
+        assert session.get(url, params=params).status_code == 200
+        etag = stand_in.fixtures[key]["headers"]["ETag"]
+        assert session.get(url, params=params, headers={"If-None-Match": etag}).status_code == 304
+    # An older recording may still hold one.
+    with open(record_dir / FIXTURES_FILE, "a") as f:
+        f.write(json.dumps({"key": key, "status": 304, "headers": {}, "body": ""}) + "\n")
+
+    fixtures = load_fixtures(str(record_dir))
+    assert fixtures[key]["status"] == 200
+    assert json.loads(fixtures[key]["body"])["events"]
+
+
+class _BrokenHistory:
+    def record(self, events):
+        raise sqlite3.OperationalError("database is locked")
+
+    def close(self):
+        pass
+
+
+def test_history_write_errors_are_counted(isolated_files, stand_in, metrics, monkeypatch):
+    day = date(2024, 3, 1)
+    stand_in.fixtures = synthetic_fixtures(sports.LEAGUES, 2, day)
+    monkeypatch.setattr(sports, "open_history", _BrokenHistory)
+
+    snapshot = sports.fetch_snapshot([day], "test", rate_per_second=1000, burst=1000, fallback_leagues=set())
+
+    assert sum(len(events) for events in snapshot.values()) == 2 * len(sports.LEAGUES)
+    assert 'digest_history_errors_total{league="NBA"}' in metrics.render_prometheus()
@@ -0,0 +1,92 @@
+import time
+from datetime import date, timedelta
+
+import sports
+from league_activity import ACTIVE_LEAD_DAYS, RECENT_EVENT_DAYS, LeagueActivity
+from replay import synthetic_fixtures
+from subscribers import followed_leagues, load_subscribers
+
+DAY = date(2024, 3, 1)
+
+
+def _fetch(day):
+    subscribers = load_subscribers({"teams": {"NBA": ["Knicks"]}})
+    return sports.fetch_snapshot([day], "test", rate_per_second=1000, burst=1000,
+                                 fallback_leagues=followed_leagues(subscribers))
+
+
+def test_unfollowed_leagues_only_call_eventsday(isolated_files, stand_in):
+    stand_in.fixtures = synthetic_fixtures(sports.LEAGUES, 2, DAY)
+
+    _fetch(DAY)
+    # One eventsday.php per league, plus NBA's past/next fallbacks.
+    assert stand_in.stats["api_requests"] == len(sports.LEAGUES) + 2
+
+    # The next day's run: new eventsday.php pages, the activity index is still current.
+    stand_in.reset_stats()
+    _fetch(DAY + timedelta(days=1))
+    assert stand_in.stats["api_requests"] == len(sports.LEAGUES)
+
+
+def _entry(next_event=None, last_event=None, checked_days_ago=0):
+    return {"next_event": next_event and next_event.isoformat(),
+            "last_event": last_event and last_event.isoformat(),
+            "season": "2024", "season_window": None,
+            "checked": int(time.time()) - checked_days_ago * 86400}
+
+
+def test_off_season_league_is_dormant():
+    activity = LeagueActivity(None)
+    assert activity.is_dormant(_entry(next_event=DAY + timedelta(days=60), last_event=DAY - timedelta(days=90)),
+                               [DAY])
+    # Nothing scheduled and nothing recent
+    assert activity.is_dormant(_entry(last_event=DAY - timedelta(days=RECENT_EVENT_DAYS + 1)), [DAY])
+    assert activity.is_dormant(_entry(), [DAY])
+
+
+def test_league_wakes_up_the_day_before_its_next_event():
+    activity = LeagueActivity(None)
+    assert activity.is_dormant(_entry(next_event=DAY + timedelta(days=ACTIVE_LEAD_DAYS + 1)), [DAY])
+    assert not activity.is_dormant(_entry(next_event=DAY + timedelta(days=ACTIVE_LEAD_DAYS)), [DAY])
+    # A range digest is active if its last day is within the lead
+    assert not activity.is_dormant(_entry(next_event=DAY + timedelta(days=7)),
+                                   [DAY + timedelta(days=i) for i in range(7)])
+
+
+def test_recent_and_past_events_keep_a_league_active():
+    activity = LeagueActivity(None)
+    # No next event known, but one within RECENT_EVENT_DAYS
+    assert not activity.is_dormant(_entry(last_event=DAY - timedelta(days=RECENT_EVENT_DAYS)), [DAY])
+    # A past range that the league played in
+    past = [DAY - timedelta(days=30 + i) for i in range(3)]
+    assert not activity.is_dormant(_entry(next_event=DAY + timedelta(days=60), last_event=DAY), past)
+    # Missing or partial entries never skip a league
+    assert not activity.is_dormant(None, [DAY])
+    assert not activity.is_dormant({"partial": True, "checked": int(time.time())}, [DAY])
+
+
+def test_needs_refresh():
+    activity = LeagueActivity(None)
+    upcoming = _entry(next_event=DAY + timedelta(days=3))
+    played = _entry(next_event=DAY - timedelta(days=1))
+    weekly = _entry(next_event=DAY + timedelta(days=3), checked_days_ago=7)
+
+    assert activity.needs_refresh(None, [DAY])
+    assert not activity.needs_refresh(upcoming, [DAY])
+    assert activity.needs_refresh(played, [DAY])
+    assert activity.needs_refresh(weekly, [DAY])
+    # Unfollowed leagues only refresh on the weekly schedule
+    assert not activity.needs_refresh(None, [DAY], followed=False)
+    assert not activity.needs_refresh(played, [DAY], followed=False)
+    assert activity.needs_refresh(weekly, [DAY], followed=False)
+
+
+def test_failed_refresh_keeps_the_old_entry(fetcher, stand_in):
+    activity = LeagueActivity(fetcher.cache)
+    old = _entry(next_event=DAY - timedelta(days=1), last_event=DAY - timedelta(days=2))
+    activity._store(4387, old)
+    stand_in.error_rate = 1.0
+
+    assert activity.refresh(fetcher, 4387, "NBA", DAY) is None
+    assert activity.lookup(4387) == old
+    assert sports._league_activity(fetcher, activity, 4387, "NBA", [DAY], DAY) == old
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+from events import Event
+from live_digest import LIVE_POLL_SECONDS, _merge, _plan_next_poll
+from sports import LEAGUES
+
+NOW = datetime(2025, 1, 10, 20, 0, tzinfo=timezone.utc)
+NBA, NFL, MLB = list(LEAGUES)[:3]
+
+
+def _event(eid, start, status=None, home_score=None, away_score=None):
+    return Event(eid, 1, "A vs B", "A", "B", "a", "b", home_score=home_score, away_score=away_score,
+                 date=start.date(), start=start, status=status)
+
+
+def test_polls_leagues_with_games_on_and_about_to_start():
+    snapshot = {
+        NBA: [_event("1", NOW - timedelta(hours=1))],
+        NFL: [_event("2", NOW + timedelta(seconds=60))],
+        MLB: [_event("3", NOW + timedelta(hours=3))],
+    }
+    assert _plan_next_poll(snapshot, NOW) == (LIVE_POLL_SECONDS, [NBA, NFL])
+
+
+def test_sleeps_until_the_next_start_when_nothing_is_on():
+    first = NOW + timedelta(hours=2)
+    snapshot = {
+        NBA: [_event("1", first), _event("2", first + timedelta(hours=1))],
+        NFL: [_event("3", first + timedelta(seconds=30))],
+        MLB: [_event("4", NOW - timedelta(hours=1), status="Match Finished")],
+    }
+    delay, leagues = _plan_next_poll(snapshot, NOW)
+    assert delay == 2 * 3600 + LIVE_POLL_SECONDS
+    assert leagues == [NBA, NFL]
+
+
+def test_stops_when_every_game_is_over():
+    snapshot = {
+        NBA: [_event("1", NOW - timedelta(hours=1), status="Match Finished")],
+        NFL: [_event("2", NOW - timedelta(hours=5))],  # past MAX_GAME_DURATION
+    }
+    assert _plan_next_poll(snapshot, NOW) == (None, [])
+
+
+def test_merge_overlays_fresh_events_and_keeps_the_rest():
+    start = NOW - timedelta(hours=1)
+    snapshot = {NBA: [_event("1", start), _event("2", start)], NFL: [_event("3", start)]}
+    live = _event("1", start, home_score=50, away_score=48)
+
+    merged = _merge(snapshot, {NBA: [live]})
+
+    assert merged[NBA][0] is live
+    assert [e.id for e in merged[NBA]] == ["1", "2"]
+    assert merged[NFL] == snapshot[NFL]
+    assert snapshot[NBA][0] is not live
@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+import pytest
+
+from events import Event
+from results_history import ResultsHistory
+
+START = date(2025, 1, 1)
+
+
+@pytest.fixture
+def history(tmp_path):
+    with ResultsHistory(str(tmp_path / "history.db")) as h:
+        yield h
+
+
+def _game(n, home_score, away_score, status="FT", home="nyk", away="bos"):
+    return Event(f"g{n}", 4387, "", f"Team {home}", f"Team {away}", home, away,
+                 home_score, away_score, START + timedelta(days=n), None, "2024-2025", status)
+
+
+def test_team_form_counts_the_current_streak(history):
+    # Oldest first from nyk's side: W L W W W
+    history.record([_game(0, 100, 90), _game(1, 80, 95), _game(2, 101, 99),
+                    _game(3, 90, 110, home="bos", away="nyk"), _game(4, 120, 100)])
+
+    nyk = history.team_form("nyk", season="2024-2025")
+    assert (nyk.wins, nyk.losses, nyk.streak) == (4, 1, "W3")
+    assert str(nyk) == "4-1 W3"
+    assert str(history.team_form("bos")) == "1-4 L3"
+    # Going into game 2, nyk had lost its last game
+    assert str(history.team_form("nyk", before=START + timedelta(days=2))) == "1-1 L1"
+    assert [e.id for e in history.last_results("nyk", n=2)] == ["g4", "g3"]
+    assert len(history.head_to_head("bos", "nyk")) == 5
+
+
+def test_draws_and_soccer_records(history):
+    history.record([_game(0, 1, 1), _game(1, 1, 1), _game(2, 2, 0)])
+    assert str(history.team_form("nyk")) == "1-0-2 W1"
+    assert str(history.team_form("bos")) == "0-1-2 L1"
+
+
+def test_live_and_called_off_games_are_not_results(history):
+    assert history.record([_game(0, 12, 20, status="Q1")]) == 0
+    assert history.team_form("nyk").games == 0
+
+    history.record([_game(0, 100, 90)])
+    assert str(history.team_form("nyk")) == "1-0 W1"
+
+    history.record([_game(0, 100, 90, status="PST")])
+    assert history.team_form("nyk").games == 0
+
+
+def test_rerecording_unchanged_results_writes_nothing(history):
+    games = [_game(0, 100, 90), _game(1, 80, 95)]
+    assert history.record(games) == 2
+    assert history.record(games) == 0
+    assert history.find_teams("nyk")[0][:2] == ("nyk", "Team nyk")
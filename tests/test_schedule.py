@@ -0,0 +1,29 @@
+from datetime import date
+
+from events import Event, ScheduleIndex
+
+
+def _event(eid, day):
+    return Event(eid, 1, "A vs B", "A", "B", "a", "b", date=day)
+
+
+def test_rescheduled_event_moves_to_its_new_date():
+    d1, d2, d3 = date(2025, 1, 10), date(2025, 1, 12), date(2025, 1, 15)
+    index = ScheduleIndex([_event("1", d1), _event("2", d1), _event("3", d3)])
+
+    index.add([_event("1", d2)])  # postponed two days
+
+    assert [e.id for e in index.events_on(d1)] == ["2"]
+    assert [e.id for e in index.events_on(d2)] == ["1"]
+    assert index.covers(d2) and index.covers(d3)
+    assert not index.covers(date(2025, 1, 16))
+
+
+def test_same_day_update_replaces_the_event():
+    day = date(2025, 1, 10)
+    index = ScheduleIndex([_event("1", day)])
+    final = _event("1", day)
+    final.home_score, final.away_score = 3, 1
+    index.add([final])
+
+    assert index.events_on(day) == [final]
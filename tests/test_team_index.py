@@ -0,0 +1,27 @@
+import pytest
+
+from team_index import TeamIndex
+
+
+def test_nicknames_and_abbreviations_resolve_to_one_team():
+    index = TeamIndex.from_config({"NBA": ["Knicks"], "MLB": ["Red Sox"], "Premier League": ["Man City"]})
+
+    assert index.is_followed("NBA", "New York Knicks")
+    assert index.is_followed("MLB", "Boston Red Sox")
+    assert not index.is_followed("MLB", "Chicago White Sox")
+    assert index.team_id("MLB", "BOS") == index.team_id("MLB", "Red Sox")
+
+
+@pytest.mark.parametrize("group, name", [("MLB", "Sox"), ("Premier League", "City"),
+                                         ("Premier League", "United")])
+def test_shared_nicknames_are_rejected(group, name):
+    with pytest.raises(ValueError, match="use the full team name"):
+        TeamIndex.from_config({group: [name]})
+
+
+def test_shared_nicknames_never_match_a_team():
+    index = TeamIndex.from_config({"Premier League": ["Manchester City"]})
+
+    assert index.team_id("English Premier League", "City") == "city"
+    assert index.is_followed("English Premier League", "Manchester City")
+    assert not index.is_followed("English Premier League", "Leicester City")